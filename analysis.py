@@ -0,0 +1,87 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from collections import deque
+from threading import Condition, Thread
+
+from config import ANALYSIS_QUEUE
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+class AnalysisWorker():
+    ''' Run function(*args) on a thread of its own, for each job
+    submitted, in order.
+
+    submit() never waits: jobs queue up to size deep, and when the
+    worker falls that far behind the oldest job is dropped to make
+    room, so the newest data is always analysed.  pending, peak (the
+    deepest the queue has been), dropped and done tell how well the
+    worker keeps up. '''
+
+    def __init__(self, function, size=ANALYSIS_QUEUE, name='analysis'):
+        self.function = function
+        self.size = size
+        self.peak = 0
+        self.dropped = 0
+        self.done = 0
+        self._jobs = deque()
+        self._condition = Condition()
+        self._running = True
+        self._behind = False
+        self._thread = Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return len(self._jobs)
+
+    def submit(self, *args):
+        ''' Queue a job; returns False if an older one was dropped '''
+        with self._condition:
+            kept = len(self._jobs) < self.size
+            if not kept:
+                self._jobs.popleft()
+                self.dropped += 1
+                if not self._behind:
+                    log.warning('%s is falling behind: %d jobs dropped'
+                                % (self._thread.name, self.dropped))
+                    self._behind = True
+            self._jobs.append(args)
+            self.peak = max(self.peak, len(self._jobs))
+            self._condition.notify()
+        return kept
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._jobs:
+                    self._behind = False
+                    self._condition.wait()
+                if not self._running:
+                    return
+                args = self._jobs.popleft()
+            try:
+                self.function(*args)
+            except Exception:
+                log.exception('%s failed' % (self._thread.name))
+            self.done += 1
+
+    def stop(self):
+        ''' Drop the jobs not yet done and end the thread '''
+        with self._condition:
+            self._running = False
+            self._jobs.clear()
+            self._condition.notify()
+        self._thread.join()
@@ -18,20 +18,28 @@
 # Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
 
 
-from numpy import fromstring
+from numpy import frombuffer, int16, ndarray
 import subprocess
 import traceback
 
-from threading import Timer
-from numpy.fft import rfft
-
+from stats import sample_stats
+from scheduler import LoggingScheduler
+from recorder import WaveRecorder
+from playback import WavePlayback
+from analysis import AnalysisWorker
+from procpool import ProcessBackend
+from mixer import open_mixer
+from pitch import PitchDetector, StringDetector
 from config import RATE, BIAS, DC_MODE_ENABLE, CAPTURE_GAIN, MIC_BOOST, \
-    MAX_LOG_ENTRIES, QUIT_MIC_BOOST, QUIT_DC_MODE_ENABLE, QUIT_CAPTURE_GAIN, \
-    QUIT_BIAS, DISPLAY_DUTY_CYCLE, XO1, XO15, XO175, XO4, MAX_GRAPHS
+    QUIT_MIC_BOOST, QUIT_DC_MODE_ENABLE, QUIT_CAPTURE_GAIN, \
+    QUIT_BIAS, DISPLAY_DUTY_CYCLE, XO1, XO15, XO175, XO4, MAX_GRAPHS, \
+    CAPTURE_LAYOUT, CAPTURE_INTERLEAVED, CAPTURE_SINK, CAPTURE_APPSINK, \
+    APPSINK_MAX_BUFFERS, APPSINK_DROP, AUDIO_BUFFER_TIMEOUT, INSTRUMENT_DICT, \
+    ANALYSIS_PROCESSES
 
 import logging
 
-from gi.repository import Gst
+from gi.repository import GLib, Gst
 
 log = logging.getLogger('measure-activity')
 log.setLevel(logging.DEBUG)
@@ -43,26 +51,16 @@ SENSOR_DC_NO_BIAS = 'voltage'
 SENSOR_DC_BIAS = 'resistance'
 
 
-def _avg(array, abs_value=False):
-    ''' Calc. the average value of an array '''
-    if len(array) == 0:
-        return 0
-    array_sum = 0
-    if abs_value:
-        for a in array:
-            array_sum += abs(a)
-    else:
-        for a in array:
-            array_sum += a
-    return float(array_sum) / len(array)
-
-
 class AudioGrab():
     """ The interface between measure and the audio device """
 
-    def __init__(self, callable1, activity):
+    def __init__(self, callable1, activity, layout=CAPTURE_LAYOUT,
+                 sink=CAPTURE_SINK, mixer=None):
         """ Initialize the class: callable1 is a data buffer;
-            activity is the parent class """
+            activity is the parent class; layout selects an interleaved
+            or a deinterleaved capture pipeline; sink selects how an
+            interleaved pipeline delivers buffers; mixer is the Mixer of
+            the sound card, by default the one config selects """
 
         self.callable1 = callable1
         self.activity = activity
@@ -86,28 +84,51 @@ class AudioGrab():
         else:
             self.channels = 2
 
+        # A single channel is always captured interleaved
+        self.interleaved = self.channels == 1 or \
+            layout == CAPTURE_INTERLEAVED
+
         self.we_are_logging = False
-        self._log_this_sample = False
-        self._logging_timer = None
-        self._logging_counter = 0
+        self._scheduler = None
+        self._recorder = None
+        self._playback = None
         self._image_counter = 0
         self._logging_interval = 0
-        self._channels_logged = []
-        self._busy = False
 
         self._dont_queue_the_buffer = False
 
         self._display_counter = DISPLAY_DUTY_CYCLE
 
         self.activity.wave.set_channels(self.channels)
-        for i in range(self.channels):
-            self._channels_logged.append(False)
+
+        # The pitch of each graphed channel, for the tuner and the
+        # logger; only tracked in the frequency base
+        self._processes = None
+        if ANALYSIS_PROCESSES:
+            try:
+                self._processes = ProcessBackend(
+                    min(self.channels, MAX_GRAPHS), self.rate)
+            except (OSError, ValueError) as e:
+                log.error('cannot start the channel processes: %s' % (e))
+        if self._processes is not None:
+            self.pitch = self._processes.channels
+        else:
+            self.pitch = [PitchDetector(self.rate)
+                          for i in range(min(self.channels, MAX_GRAPHS))]
+        self.strings = None
+
+        # Pitch tracking and logging run on a worker thread, so that
+        # capture never waits for them
+        self._counted = [0] * (self.channels + 1)
+        self.analysis = AnalysisWorker(self._analyse_buffer)
 
         # Set mixer to known state
-        self.set_dc_mode(DC_MODE_ENABLE)
-        self.set_bias(BIAS)
-        self.set_capture_gain(CAPTURE_GAIN)
-        self.set_mic_boost(MIC_BOOST)
+        self.mixer = open_mixer() if mixer is None else mixer
+        with self.mixer.batch():
+            self.set_dc_mode(DC_MODE_ENABLE)
+            self.set_bias(BIAS)
+            self.set_capture_gain(CAPTURE_GAIN)
+            self.set_mic_boost(MIC_BOOST)
 
         self.master = self.get_master()
         self.dc_mode = self.get_dc_mode()
@@ -120,6 +141,8 @@ class AudioGrab():
         self.pads = []
         self.queue = []
         self.fakesink = []
+        self.appsink = None
+        self._pull_id = None
         self.pipeline = Gst.Pipeline.new('pipeline')
         self.alsasrc = Gst.ElementFactory.make('alsasrc', 'alsa-source')
         self.pipeline.add(self.alsasrc)
@@ -128,10 +151,22 @@ class AudioGrab():
         caps_str = 'audio/x-raw,rate=(int)%d,channels=(int)%d,depth=(int)16' \
             % (RATE, self.channels)
         self.caps1.props.caps = Gst.caps_from_string(caps_str)
-        if self.channels == 1:
+        if self.interleaved and sink == CAPTURE_APPSINK:
+            self.appsink = Gst.ElementFactory.make('appsink', 'asink')
+            if self.appsink is None:
+                log.warning('no appsink, falling back to fakesink')
+        if self.appsink is not None:
+            self.appsink.props.emit_signals = False
+            self.appsink.props.sync = False
+            self.appsink.props.max_buffers = APPSINK_MAX_BUFFERS
+            self.appsink.props.drop = APPSINK_DROP
+            self.pipeline.add(self.appsink)
+            self.alsasrc.link(self.caps1)
+            self.caps1.link(self.appsink)
+        elif self.interleaved:
             self.fakesink.append(Gst.ElementFactory.make('fakesink', 'fsink'))
             self.pipeline.add(self.fakesink[0])
-            self.fakesink[0].connect('handoff', self.on_buffer, 0)
+            self.fakesink[0].connect('handoff', self.on_interleaved_buffer)
             self.fakesink[0].props.signal_handoffs = True
             self.alsasrc.link(self.caps1)
             self.caps1.link(self.fakesink[0])
@@ -198,76 +233,237 @@ class AudioGrab():
     def on_buffer(self, element, data_buffer, pad, channel):
         '''The function that is called whenever new data is available
         This is the signal handler for the handoff signal'''
-        size = data_buffer.get_size()
-        temp_buffer = fromstring(data_buffer.extract_dup(0, size), 'int16')
-        if not self._dont_queue_the_buffer:
+        # Map the buffer read-only and look at it in place; the only
+        # copy made is the one into the ring buffer of the display.
+        # Nothing may hold on to temp_buffer after the unmap.
+        success, map_info = data_buffer.map(Gst.MapFlags.READ)
+        if not success:
+            log.warning('could not map buffer for channel %d' % (channel))
+            return False
+        try:
+            temp_buffer = frombuffer(map_info.data, dtype=int16)
+            self._record(temp_buffer, channel)
             self._new_buffer(temp_buffer, channel=channel)
+            self._analyse(temp_buffer, channel, self._offset_of(data_buffer))
+        finally:
+            data_buffer.unmap(map_info)
+        return False
 
-        if self._busy:  # busy writing previous sample
+    def on_interleaved_buffer(self, element, data_buffer, pad):
+        '''Handle a buffer of the interleaved pipeline, from either the
+        fakesink handoff signal or the appsink: one call carries every
+        channel, which are split with strided views so that they stay
+        sample aligned'''
+        success, map_info = data_buffer.map(Gst.MapFlags.READ)
+        if not success:
+            log.warning('could not map interleaved buffer')
             return False
-        if self.we_are_logging:
-            if self._logging_counter == MAX_LOG_ENTRIES:
-                self._logging_counter = 0
+        try:
+            frames = frombuffer(map_info.data, dtype=int16)
+            frames = frames[:len(frames) - len(frames) % self.channels]
+            frames = frames.reshape(-1, self.channels)
+            self._record(frames, None)
+            self._handle_frames(frames, self._offset_of(data_buffer))
+        finally:
+            data_buffer.unmap(map_info)
+        return False
+
+    def _handle_frames(self, frames, offset):
+        ''' Display, track and log interleaved frames of every channel '''
+        self._new_buffer(frames, channel=None)
+        self._analyse(frames, None, offset)
+
+    def _analyse(self, samples, channel, offset):
+        ''' Hand a copy of a buffer to the analysis worker, with its
+        offset in the stream; where the source gives none, frames are
+        counted here, so that buffers the worker drops show up as gaps
+        in the log '''
+        key = -1 if channel is None else channel
+        if offset is None:
+            offset = self._counted[key]
+        self._counted[key] = offset + len(samples)
+        self.analysis.submit(samples.copy(), channel, offset)
+
+    def _analyse_buffer(self, samples, channel, offset):
+        ''' Track and log a buffer, on the analysis worker '''
+        if channel is not None:
+            self._track_pitch(samples, channel)
+            self._process_buffer(samples, channel, offset)
+            return
+        for channel in range(min(self.channels, MAX_GRAPHS)):
+            self._track_pitch(samples[:, channel], channel)
+            self._process_buffer(samples[:, channel], channel, offset)
+
+    def _post(self, function, *args, **kwargs):
+        ''' Call function on the main loop '''
+        def call():
+            function(*args, **kwargs)
+            return False
+        GLib.idle_add(call)
+
+    def _play_frames(self, frames, offset):
+        ''' Take frames of a recording as if they had been captured;
+        channels are dropped or repeated to match the capture '''
+        if frames.shape[1] != self.channels:
+            frames = frames[:, [min(i, frames.shape[1] - 1)
+                                for i in range(self.channels)]]
+        self._handle_frames(frames.view(ndarray), offset)
+
+    def start_playback(self, path, speed=1.0):
+        ''' Show and analyse a recording instead of the capture '''
+        self.stop_playback()
+        playback = WavePlayback(path, self._play_frames, speed,
+                                finished=self._playback_finished)
+        if playback.rate != self.rate:
+            log.warning('%s was recorded at %d Hz, not %d Hz' % (
+                path, playback.rate, self.rate))
+        self.stop_sound_device()
+        self._playback = playback
+        for i in range(self.channels):
+            self.activity.wave.set_graph_source(i, 1)
+        playback.start()
+        return playback
+
+    def stop_playback(self):
+        ''' Return to the capture '''
+        if self._playback is None:
+            return
+        self._playback.close()
+        self._playback = None
+        for i in range(self.channels):
+            self.activity.wave.set_graph_source(i, 0)
+        self.start_sound_device()
+
+    def _playback_finished(self):
+        ''' The recording has been played to its end '''
+        self.stop_playback()
+        self.activity.playback_stopped()
+
+    def get_playback(self):
+        ''' The WavePlayback being shown, or None '''
+        return self._playback
+
+    def _pull_buffers(self):
+        ''' Drain the appsink from the main loop, at most
+        APPSINK_MAX_BUFFERS buffers per call, so that analysis never
+        competes with drawing for the interpreter '''
+        for i in range(APPSINK_MAX_BUFFERS):
+            sample = self.appsink.emit('try-pull-sample', 0)
+            if sample is None:
+                break
+            self.on_interleaved_buffer(self.appsink, sample.get_buffer(),
+                                       None)
+        return True
+
+    def _record(self, samples, channel):
+        ''' Pass the raw samples to the recorder, if we are recording '''
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.write(samples, channel)
+
+    def start_recording(self, path):
+        ''' Record the raw capture of every channel to a WAV file '''
+        self.stop_recording()
+        self._recorder = WaveRecorder(path, self.rate, self.channels)
+
+    def stop_recording(self):
+        ''' Finish the recording; returns the WaveRecorder, or None if
+        we were not recording '''
+        recorder = self._recorder
+        self._recorder = None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
+    def is_recording(self):
+        return self._recorder is not None
+
+    def _offset_of(self, data_buffer):
+        ''' The offset of a buffer in the stream, in frames, or None
+        when the source does not say '''
+        if data_buffer.offset == Gst.BUFFER_OFFSET_NONE:
+            return None
+        return data_buffer.offset
+
+    def _process_buffer(self, temp_buffer, channel, offset=None):
+        ''' Log and sample one buffer of a channel '''
+        scheduler = self._scheduler
+        if self.we_are_logging and scheduler is not None:
+            for index, window in scheduler.process(temp_buffer, channel,
+                                                   offset):
+                self._emit_for_logging(window, channel, index)
+            if scheduler.finished and scheduler is self._scheduler:
+                self._scheduler = None
                 self.we_are_logging = False
-                self.activity.data_logger.stop_session()
-            else:
-                if self._logging_interval == 0:
-                    self._emit_for_logging(temp_buffer, channel=channel)
-                    self._log_this_sample = False
-                    self.we_are_logging = False
-                    self.activity.data_logger.stop_session()
-                elif self._log_this_sample:
-                    # Sample channels in order
-                    if self._channels_logged.index(False) == channel:
-                        self._channels_logged[channel] = True
-                        self._emit_for_logging(temp_buffer, channel=channel)
-                        # Have we logged every channel?
-                        if self._channels_logged.count(True) == self.channels:
-                            self._log_this_sample = False
-                            for i in range(self.channels):
-                                self._channels_logged[i] = False
-                            self._logging_counter += 1
+                # On the main loop, where sessions start and stop
+                self._post(self.activity.data_logger.stop_session,
+                           self.activity.session_id)
 
         # In sensor mode, periodly update the textbox with a sample value
         if self.activity.CONTEXT == 'sensor' and not self.we_are_logging:
             # Only update display every nth time, where n=DISPLAY_DUTY_CYCLE
             if self._display_counter == 0:
+                stats = sample_stats(temp_buffer)
                 if self.activity.sensor_toolbar.mode == 'resistance':
-                    self.activity.sensor_toolbar.set_sample_value(
-                        int(self._calibrate_resistance(temp_buffer)),
-                        channel=channel)
+                    self._post(self.activity.sensor_toolbar.set_sample_value,
+                               int(self._calibrate_resistance(stats)),
+                               channel=channel)
                 else:
-                    self.activity.sensor_toolbar.set_sample_value(
-                        '%0.3f' % (self._calibrate_voltage(temp_buffer)),
-                        channel=channel)
+                    self._post(self.activity.sensor_toolbar.set_sample_value,
+                               '%0.3f' % (self._calibrate_voltage(stats)),
+                               channel=channel)
                 self._display_counter = DISPLAY_DUTY_CYCLE
             else:
                 self._display_counter -= 1
-        return False
 
-    def _sample_sound(self, data_buffer):
+    def _sample_sound(self, stats):
         ''' The average magnitude of the sound '''
-        return _avg(data_buffer, abs_value=True)
-
-    def _sample_frequency(self, data_buffer):
-        ''' The maximum frequency in the sample '''
-        buf = rfft(data_buffer)
-        buf = abs(buf)
-        maxi = buf.argmax()
-        if maxi == 0:
-            pitch = 0.0
-        else:  # Simple interpolation
-            a, b, c = buf[maxi - 1], buf[maxi], buf[maxi + 1]
-            maxi -= a / float(a + b + c)
-            maxi += c / float(a + b + c)
-            pitch = maxi * 48000 / (len(buf) * 2)
-        # Convert output to Hertz
-        return pitch
-
-    def _calibrate_resistance(self, data_buffer):
+        return stats.mean_abs
+
+    def _track_pitch(self, samples, channel):
+        ''' Feed the pitch detectors, in the frequency base only; the
+        strings of the instrument being tuned are followed on the first
+        channel '''
+        wave = self.activity.wave
+        if channel >= len(self.pitch) or not wave.get_fft_mode():
+            return
+        self.pitch[channel].feed(samples)
+        if channel != 0:
+            return
+        targets = INSTRUMENT_DICT.get(wave.instrument)
+        if self._processes is not None:
+            # The process of the first channel tunes the strings too
+            self.pitch[0].set_targets(targets)
+            self.strings = self.pitch[0] if targets else None
+            return
+        if not targets:
+            self.strings = None
+            return
+        if self.strings is None or \
+                list(self.strings.targets) != list(targets):
+            self.strings = StringDetector(targets, self.rate)
+        self.strings.feed(samples)
+
+    def get_strings(self):
+        ''' The cents offset of each string of the instrument being
+        tuned (nan when a string is not sounding), or None '''
+        strings = self.strings
+        if strings is None or not self.activity.wave.get_fft_mode():
+            return None
+        return strings.cents
+
+    def get_pitch(self, channel=0):
+        ''' The latest pitch of a channel, in Hz; 0.0 when there is
+        none, or outside the frequency base '''
+        if channel >= len(self.pitch) or \
+                not self.activity.wave.get_fft_mode():
+            return 0.0
+        return self.pitch[channel].frequency
+
+    def _calibrate_resistance(self, stats):
         ''' Return calibrated value for resistance '''
         # See <http://bugs.sugarlabs.org/ticket/552#comment:7>
-        avg_buffer = _avg(data_buffer)
+        avg_buffer = stats.mean
         if self.activity.hw == XO1:
             return 2.718 ** ((avg_buffer * 0.000045788) + 8.0531)
         elif self.activity.hw == XO15:
@@ -280,10 +476,10 @@ class AudioGrab():
         else:  # XO 3.0
             return (46000000 / (30514 - avg_buffer)) - 1150
 
-    def _calibrate_voltage(self, data_buffer):
+    def _calibrate_voltage(self, stats):
         ''' Return calibrated value for voltage '''
         # See <http://bugs.sugarlabs.org/ticket/552#comment:7>
-        return _avg(data_buffer) * self._voltage_gain + self._voltage_bias
+        return stats.mean * self._voltage_gain + self._voltage_bias
 
     def set_freeze_the_display(self, freeze=False):
         ''' Useful when just the display is needed to be frozen, but
@@ -294,72 +490,57 @@ class AudioGrab():
         '''Returns state of queueing the buffer'''
         return not self._dont_queue_the_buffer
 
-    def _emit_for_logging(self, data_buffer, channel=0):
+    def _emit_for_logging(self, data_buffer, channel=0, sample=0):
         '''Sends the data for logging'''
-        if not self._busy:
-            self._busy = True
-            if self.activity.CONTEXT == 'sensor':
-                if self.activity.sensor_toolbar.mode == 'resistance':
-                    value = self._calibrate_resistance(data_buffer)
-                    value_string = int(value)
-                else:
-                    value = self._calibrate_voltage(data_buffer)
-                    value_string = '0.3f' % (value)
-            else:
-                if not self.activity.wave.get_fft_mode():
-                    value = self._sample_sound(data_buffer)
-                else:
-                    value = self._sample_frequency(data_buffer)
+        if self.activity.CONTEXT == 'sensor':
+            stats = sample_stats(data_buffer)
+            if self.activity.sensor_toolbar.mode == 'resistance':
+                value = self._calibrate_resistance(stats)
                 value_string = int(value)
-            self.activity.sensor_toolbar.set_sample_value(
-                value_string, channel=channel)
-            if self.channels > 1:
-                self.activity.data_logger.write_value(
-                    value_string, channel=channel,
-                    sample=self._logging_counter)
             else:
-                self.activity.data_logger.write_value(
-                    value_string, sample=self._logging_counter)
-            self._busy = False
+                value = self._calibrate_voltage(stats)
+                value_string = '%0.3f' % (value)
+        else:
+            if not self.activity.wave.get_fft_mode():
+                value = self._sample_sound(sample_stats(data_buffer))
+            else:
+                value = self.get_pitch(channel)
+            value_string = int(value)
+        self._post(self.activity.sensor_toolbar.set_sample_value,
+                   value_string, channel=channel)
+        if self.channels > 1:
+            self.activity.data_logger.write_value(
+                value_string, channel=channel, sample=sample)
         else:
-            log.debug('skipping sample %d.%d' % (
-                self._logging_counter, channel))
+            self.activity.data_logger.write_value(
+                value_string, sample=sample)
 
     def start_sound_device(self):
         '''Start or Restart grabbing data from the audio capture'''
         Gst.Event.new_flush_start()
         self.pipeline.set_state(Gst.State.PLAYING)
+        if self.appsink is not None and self._pull_id is None:
+            self._pull_id = GLib.timeout_add(AUDIO_BUFFER_TIMEOUT,
+                                             self._pull_buffers)
 
     def stop_sound_device(self):
         '''Stop grabbing data from capture device'''
         Gst.Event.new_flush_stop(False)
         self.pipeline.set_state(Gst.State.NULL)
+        if self._pull_id is not None:
+            GLib.source_remove(self._pull_id)
+            self._pull_id = None
 
     def set_logging_params(self, start_stop=False, interval=0):
         ''' Configures for logging of data: starts or stops a session;
         and sets the logging interval. '''
-        self.we_are_logging = start_stop
         self._logging_interval = interval
-        if not start_stop:
-            if self._logging_timer:
-                self._logging_timer.cancel()
-                self._logging_timer = None
-                self._log_this_sample = False
-                self._logging_counter = 0
-        elif interval != 0:
-            self._make_timer()
-        self._busy = False
-
-    def _sample_now(self):
-        ''' Log the current sample now. This method is called from the
-        _logging_timer object when the interval expires. '''
-        self._log_this_sample = True
-        self._make_timer()
-
-    def _make_timer(self):
-        ''' Create the next timer that will trigger data logging. '''
-        self._logging_timer = Timer(self._logging_interval, self._sample_now)
-        self._logging_timer.start()
+        if start_stop:
+            self._scheduler = LoggingScheduler(
+                self.rate, interval, min(self.channels, MAX_GRAPHS))
+        else:
+            self._scheduler = None
+        self.we_are_logging = start_stop
 
     def set_sampling_rate(self, sr):
         ''' Sets the sampling rate of the logging device. Sampling
@@ -396,6 +577,8 @@ class AudioGrab():
         '''When Activity becomes active after going to background'''
         if self.we_are_logging:
             log.debug('We are logging... already grabbing.')
+        elif self._playback is not None:
+            log.debug('Playing a recording... will not restore grabbing.')
         else:
             log.debug('Restore grabbing.')
             self.restore_state()
@@ -410,6 +593,7 @@ class AudioGrab():
 
     def save_state(self):
         '''Saves the state of all audio controls'''
+        self.mixer.refresh()
         self.master = self.get_master()
         self.bias = self.get_bias()
         self.dc_mode = self.get_dc_mode()
@@ -418,26 +602,23 @@ class AudioGrab():
 
     def restore_state(self):
         '''Put back all audio control settings from the saved state'''
-        self.set_master(self.master)
-        self.set_bias(self.bias)
+        # Others may have changed them while we were in the background
+        self.mixer.refresh()
+        with self.mixer.batch():
+            self.set_master(self.master)
+            self.set_bias(self.bias)
         self.stop_grabbing()
-        if self.channels > 1:
+        if not self.interleaved:
             self._unlink_sink_queues()
         self.set_dc_mode(self.dc_mode)
         self.start_grabbing()
-        self.set_capture_gain(self.capture_gain)
-        self.set_mic_boost(self.mic_boost)
+        with self.mixer.batch():
+            self.set_capture_gain(self.capture_gain)
+            self.set_mic_boost(self.mic_boost)
 
     def amixer_set(self, control, state):
-        ''' Direct call to amixer for old systems. '''
-        if state:
-            check_output(
-                ['amixer', 'set', "%s" % (control), 'unmute'],
-                'Problem with amixer set "%s" unmute' % (control))
-        else:
-            check_output(
-                ['amixer', 'set', "%s" % (control), 'mute'],
-                'Problem with amixer set "%s" mute' % (control))
+        ''' Switch a mixer control on (unmute) or off (mute). '''
+        self.mixer.set_switch(control, state)
 
     def mute_master(self):
         '''Mutes the Master Control'''
@@ -451,27 +632,13 @@ class AudioGrab():
         '''Sets the Master gain slider settings
         master_val must be given as an integer between 0 and 100 indicating the
         percentage of the slider to be set'''
-        check_output(
-            ['amixer', 'set', 'Master', "%d%s" % (master_val, '%')],
-            'Problem with amixer set Master')
+        self.mixer.set_volume('Master', master_val)
 
     def get_master(self):
         '''Gets the MIC gain slider settings. The value returned is an
         integer between 0 and 100 and is an indicative of the
         percentage 0 to 100%'''
-        output = check_output(['amixer', 'get', 'Master'],
-        
-                              'amixer: Could not get Master volume')
-        if output is None:
-            return 100
-        else:
-            pos = output.find('Front Left:')
-            if pos == -1:
-                pos = output.find('Mono:')
-            output = output[pos:]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find('%]')]
-            return int(output)
+        return self.mixer.get_volume('Master')
 
     def set_bias(self, bias_state=False):
         '''Enables / disables bias voltage.'''
@@ -486,17 +653,7 @@ class AudioGrab():
             control = 'MIC Bias Enable'
         else:
             control = 'V_REFOUT Enable'
-        output = check_output(['amixer', 'get', control],
-                              'amixer: Could not get mic bias voltage')
-        if output is None:
-            return False
-        else:
-            output = output[output.find('Mono:'):]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find(']')]
-            if output == 'on':
-                return True
-            return False
+        return self.mixer.get_switch(control)
 
     def set_dc_mode(self, dc_mode=False):
         '''Sets the DC Mode Enable control
@@ -506,17 +663,7 @@ class AudioGrab():
     def get_dc_mode(self):
         '''Returns the setting of DC Mode Enable control
         i.e. True: Unmuted and False: Muted'''
-        output = check_output(['amixer', 'get', "DC Mode Enable"],
-                              'amixer: Could not get DC Mode')
-        if output is None:
-            return False
-        else:
-            output = output[output.find('Mono:'):]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find(']')]
-            if output == 'on':
-                return True
-            return False
+        return self.mixer.get_switch('DC Mode Enable')
 
     def set_mic_boost(self, mic_boost=False):
         '''Set Mic Boost.
@@ -528,64 +675,31 @@ class AudioGrab():
         '''Return Mic Boost setting.
         for analog mic boost: True = +20dB, False = 0dB
         for mic1 boost: True = 8, False = 0'''
-        output = check_output(['amixer', 'get', "Mic Boost (+20dB)"],
-                              'amixer: Could not get mic boost')
-        if output is None:
-            return False
-        else:
-            output = output[output.find('Mono:'):]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find(']')]
-            if output == 'on':
-                return True
-            return False
+        return self.mixer.get_switch('Mic Boost (+20dB)')
 
     def set_capture_gain(self, capture_val):
         '''Sets the Capture gain slider settings capture_val must be
         given as an integer between 0 and 100 indicating the
         percentage of the slider to be set'''
-        check_output(
-            ['amixer', 'set', 'Capture', "%d%s" % (capture_val, '%')],
-            'Problem with amixer set Capture')
+        self.mixer.set_volume('Capture', capture_val)
 
     def get_capture_gain(self):
         '''Gets the Capture gain slider settings. The value returned
         is an integer between 0 and 100 and is an indicative of the
         percentage 0 to 100%'''
-        output = check_output(['amixer', 'get', 'Capture'],
-                              'amixer: Could not get Capture level')
-        if output is None:
-            return 100
-        else:
-            pos = output.find('Front Left:')
-            if pos == -1:
-                pos = output.find('Mono:')
-            output = output[pos:]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find('%]')]
-            return int(output)
+        return self.mixer.get_volume('Capture')
 
     def set_mic_gain(self, mic_val):
         '''Sets the MIC gain slider settings mic_val must be given as
         an integer between 0 and 100 indicating the percentage of the
         slider to be set'''
-        check_output(
-            ['amixer', 'set', 'Mic', "%d%s" % (mic_val, '%')],
-            'Problem with amixer set Mic')
+        self.mixer.set_volume('Mic', mic_val)
 
     def get_mic_gain(self):
         '''Gets the MIC gain slider settings. The value returned is an
         integer between 0 and 100 and is an indicative of the
         percentage 0 to 100%'''
-        output = check_output(['amixer', 'get', 'Mic'],
-                              'amixer: Could not get mic gain level')
-        if output is None:
-            return 100
-        else:
-            output = output[output.find('Mono:'):]
-            output = output[output.find('[') + 1:]
-            output = output[:output.find('%]')]
-            return int(output)
+        return self.mixer.get_volume('Mic')
 
     def set_sensor_type(self, sensor_type=SENSOR_AC_BIAS):
         '''Set the type of sensor you want to use. Set sensor_type according
@@ -611,37 +725,51 @@ class AudioGrab():
     def _set_sensor_type(self, mode=None, bias=None, gain=None, boost=None):
         '''Helper to modify (some) of the sensor settings.'''
 
-        if mode is not None:
-            # If we change to/from dc mode, we need to rebuild the pipelines
-            log.debug('sensor mode has changed')
-            self.stop_grabbing()
-            if self.channels > 1:
-                self._unlink_sink_queues()
-            self.start_grabbing()
-            self.set_dc_mode(mode)
-            log.debug('dcmode is: %s' % (str(self.get_dc_mode())))
-            if self.activity.hw == XO1 and \
-               hasattr(self.activity, 'sensor_toolbar'):
+        # The mixer controls that change are set together at the end
+        with self.mixer.batch():
+            if mode is not None:
+                # If we change to/from dc mode, we need to rebuild the
+                # pipelines
+                log.debug('sensor mode has changed')
+                self.stop_grabbing()
+                if not self.interleaved:
+                    self._unlink_sink_queues()
+                self.start_grabbing()
+                self.set_dc_mode(mode)
+
+            # Without deinterleave there are no pads to wait for
+            if self.interleaved and hasattr(self.activity, 'sensor_toolbar'):
                 self.activity.sensor_toolbar.unlock_radio_buttons()
 
-        if bias is not None:
-            self.set_bias(bias)
+            if bias is not None:
+                self.set_bias(bias)
 
-        if gain is not None:
-            self.set_capture_gain(gain)
+            if gain is not None:
+                self.set_capture_gain(gain)
 
-        if boost is not None:
-            self.set_mic_boost(boost)
+            if boost is not None:
+                self.set_mic_boost(boost)
+
+        if mode is not None:
+            log.debug('dcmode is: %s' % (str(self.get_dc_mode())))
 
         self.save_state()
 
     def on_activity_quit(self):
         '''When Activity quits'''
-        self.set_mic_boost(QUIT_MIC_BOOST)
-        self.set_dc_mode(QUIT_DC_MODE_ENABLE)
-        self.set_capture_gain(QUIT_CAPTURE_GAIN)
-        self.set_bias(QUIT_BIAS)
+        with self.mixer.batch():
+            self.set_mic_boost(QUIT_MIC_BOOST)
+            self.set_dc_mode(QUIT_DC_MODE_ENABLE)
+            self.set_capture_gain(QUIT_CAPTURE_GAIN)
+            self.set_bias(QUIT_BIAS)
         self.stop_sound_device()
+        self.analysis.stop()
+        if self._processes is not None:
+            self._processes.close()
+        self.stop_recording()
+        if self._playback is not None:
+            self._playback.close()
+            self._playback = None
         if self.we_are_logging:
             self.activity.data_logger.stop_session()
 
@@ -680,12 +808,9 @@ class AudioGrab_XO175(AudioGrab):
 
     def on_activity_quit(self):
         AudioGrab.on_activity_quit(self)
-        check_output(
-            ['amixer', 'set', 'MIC1 Boost', "87%"],
-            'restore MIC1 Boost')  # OLPC OS up to 13.2.5
-        check_output(
-            ['amixer', 'set', 'Analog Mic Boost', "62%"],
-            'restore Analog Mic Boost')  # OLPC OS after 13.2.5
+        with self.mixer.batch():
+            self.mixer.set_volume('MIC1 Boost', 87)  # OLPC OS up to 13.2.5
+            self.mixer.set_volume('Analog Mic Boost', 62)  # after 13.2.5
 
 
 class AudioGrab_XO4(AudioGrab):
@@ -703,9 +828,7 @@ class AudioGrab_XO4(AudioGrab):
 
     def on_activity_quit(self):
         AudioGrab.on_activity_quit(self)
-        check_output(
-            ['amixer', 'set', 'Analog Mic Boost', "62%"],
-            'restore Analog Mic Boost')
+        self.mixer.set_volume('Analog Mic Boost', 62)
 
 
 class AudioGrabNoDC(AudioGrab):
@@ -0,0 +1,96 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Allocations and copies of a captured Gst.Buffer on its way into the
+display's ring buffer, at 48 kHz with 2 channels in 100 ms buffers,
+one handoff per channel as with deinterleave: the extract_dup() and
+fromstring() of the old handoff against the read-only map() and
+frombuffer() of the new one.  Allocations are counted by tracemalloc,
+as the payloads that the peak of memory in use holds.  The copy the
+analysis worker takes of each buffer is not part of this path.
+Needs PyGObject with GStreamer, as the activity does. '''
+
+from timing import best, report
+
+import tracemalloc
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+import numpy as np
+
+from ringbuffer import RingBuffer2d
+
+RATE = 48000
+CHANNELS = 2
+FRAMES = RATE // 10
+HANDOFFS = CHANNELS * RATE // FRAMES  # a second
+
+
+def old_handoff(ring, buf, channel):
+    size = buf.get_size()
+    # numpy.fromstring() copied, as frombuffer().copy() does
+    samples = np.frombuffer(buf.extract_dup(0, size), np.int16).copy()
+    ring.append(samples, channel=channel)
+
+
+def new_handoff(ring, buf, channel):
+    success, info = buf.map(Gst.MapFlags.READ)
+    try:
+        ring.append(np.frombuffer(info.data, dtype=np.int16),
+                    channel=channel)
+    finally:
+        buf.unmap(info)
+
+
+def allocations(handoff, ring, buffers):
+    ''' The payloads allocated by a second of handoffs, counted as
+    the peak of memory in use during each handoff over the payload
+    size, and the bytes of them '''
+    payload = FRAMES * 2
+    count = size = 0
+    tracemalloc.start()
+    for k in range(HANDOFFS):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        handoff(ring, buffers[k % CHANNELS], k % CHANNELS)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        count += peak // payload
+        size += peak // payload * payload
+    tracemalloc.stop()
+    return count, size
+
+
+def main():
+    Gst.init(None)
+    samples = np.random.RandomState(1).randint(
+        -32768, 32767, FRAMES).astype(np.int16)
+    buffers = [Gst.Buffer.new_wrapped(samples.tobytes())
+               for channel in range(CHANNELS)]
+    print('%d Hz, %d channels, %d-frame buffers: %d handoffs a second, '
+          '%d bytes a second of samples'
+          % (RATE, CHANNELS, FRAMES, HANDOFFS, HANDOFFS * FRAMES * 2))
+    for name, handoff in (('extract_dup + fromstring', old_handoff),
+                          ('map + frombuffer', new_handoff)):
+        ring = RingBuffer2d(CHANNELS, RATE, dtype=np.int16)
+        count, size = allocations(handoff, ring, buffers)
+        report('%s: payload allocations' % (name), count, '/s')
+        report('%s: bytes allocated' % (name), size, 'B/s')
+        # The ring buffer copy is made by both
+        report('%s: bytes copied' % (name),
+               HANDOFFS * FRAMES * 2 * (3 if handoff is old_handoff
+                                        else 1), 'B/s')
+        report('%s: time' % (name),
+               best(lambda: handoff(ring, buffers[0], 0), 1000), 'us')
+
+
+if __name__ == '__main__':
+    main()
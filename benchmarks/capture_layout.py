@@ -0,0 +1,146 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' The capture layouts AudioGrab offers, with audiotestsrc in place of
+alsasrc so that no sound card is needed: deinterleave with a queue and
+a fakesink per channel, one interleaved fakesink, and one interleaved
+appsink drained by the caller.  Each runs a stereo 48 kHz stream as
+fast as it goes, into a RingBuffer2d as the display does, and gives
+the Python calls, the threads of the process, the wall and CPU time,
+the frames that reached each channel, and how far one channel got
+ahead of another.  Needs PyGObject with GStreamer, as the activity
+does. '''
+
+from timing import report
+
+import os
+import sys
+import time
+
+import gi
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+import numpy as np
+
+from ringbuffer import RingBuffer2d
+from config import CAPTURE_DEINTERLEAVE, CAPTURE_INTERLEAVED, \
+    CAPTURE_APPSINK
+
+RATE = 48000
+CHANNELS = 2
+FRAMES = 1024
+SECONDS = 60
+
+SOURCE = 'audiotestsrc num-buffers=%d samplesperbuffer=%d ' \
+    'is-live=false ! audio/x-raw,format=S16LE,rate=%d,channels=%d ! ' \
+    % (SECONDS * RATE // FRAMES, FRAMES, RATE, CHANNELS)
+SINK = 'signal-handoffs=true sync=false'
+PIPELINES = {
+    CAPTURE_DEINTERLEAVE: SOURCE + 'deinterleave name=split '
+    'keep-positions=true ' + ' '.join(
+        'split.src_%d ! queue ! fakesink name=sink%d %s' % (i, i, SINK)
+        for i in range(CHANNELS)),
+    CAPTURE_INTERLEAVED: SOURCE + 'fakesink name=sink0 ' + SINK,
+    CAPTURE_APPSINK: SOURCE + 'appsink name=sink0 sync=false '
+    'emit-signals=false max-buffers=16 drop=false',
+}
+
+
+class Capture():
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.calls = 0
+        self.threads = 0
+        self.skew = 0  # most frames one channel was ahead
+        self.ring = RingBuffer2d(CHANNELS, RATE, dtype=np.int16)
+        self.pipeline = Gst.parse_launch(PIPELINES[layout])
+
+    def on_buffer(self, element, buf, pad, channel):
+        ''' A buffer of one channel, as AudioGrab.on_buffer takes it '''
+        self.calls += 1
+        self.threads = max(self.threads, _threads())
+        success, info = buf.map(Gst.MapFlags.READ)
+        try:
+            self.ring.append(np.frombuffer(info.data, dtype=np.int16),
+                             channel=channel)
+        finally:
+            buf.unmap(info)
+        written = [self.ring.written(i) for i in range(CHANNELS)]
+        self.skew = max(self.skew, max(written) - min(written))
+
+    def on_interleaved_buffer(self, element, buf, pad=None):
+        ''' A buffer of every channel, split by strided views, as
+        AudioGrab.on_interleaved_buffer does '''
+        self.calls += 1
+        self.threads = max(self.threads, _threads())
+        success, info = buf.map(Gst.MapFlags.READ)
+        try:
+            frames = np.frombuffer(info.data, dtype=np.int16)
+            frames = frames[:len(frames) - len(frames) % CHANNELS]
+            self.ring.append(frames.reshape(-1, CHANNELS))
+        finally:
+            buf.unmap(info)
+
+    def run(self):
+        if self.layout == CAPTURE_DEINTERLEAVE:
+            for i in range(CHANNELS):
+                self.pipeline.get_by_name('sink%d' % (i)).connect(
+                    'handoff', self.on_buffer, i)
+        elif self.layout == CAPTURE_INTERLEAVED:
+            self.pipeline.get_by_name('sink0').connect(
+                'handoff', self.on_interleaved_buffer)
+        self.pipeline.set_state(Gst.State.PLAYING)
+        if self.layout == CAPTURE_APPSINK:
+            sink = self.pipeline.get_by_name('sink0')
+            while True:
+                sample = sink.emit('try-pull-sample', Gst.SECOND)
+                if sample is None:
+                    break
+                self.on_interleaved_buffer(sink, sample.get_buffer())
+        bus = self.pipeline.get_bus()
+        message = bus.timed_pop_filtered(
+            Gst.CLOCK_TIME_NONE,
+            Gst.MessageType.EOS | Gst.MessageType.ERROR)
+        self.pipeline.set_state(Gst.State.NULL)
+        if message.type == Gst.MessageType.ERROR:
+            sys.exit('%s: %s' % (self.layout, message.parse_error()[0]))
+
+
+def _threads():
+    return len(os.listdir('/proc/self/task'))
+
+
+def main():
+    Gst.init(None)
+    print('%d s of %d Hz audio, %d channels, %d-frame buffers'
+          % (SECONDS, RATE, CHANNELS, FRAMES))
+    for layout in (CAPTURE_DEINTERLEAVE, CAPTURE_INTERLEAVED,
+                   CAPTURE_APPSINK):
+        capture = Capture(layout)
+        started = time.perf_counter()
+        cpu = time.process_time()
+        capture.run()
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu
+        report('%s: Python calls' % (layout), capture.calls, '')
+        report('%s: threads of the process' % (layout), capture.threads,
+               '')
+        report('%s: wall time' % (layout), wall, 's')
+        report('%s: CPU time' % (layout), cpu, 's')
+        report('%s: frames per channel' % (layout), min(
+            capture.ring.written(i) for i in range(CHANNELS)), '')
+        report('%s: most one channel was ahead' % (layout),
+               capture.skew, 'frames')
+
+
+if __name__ == '__main__':
+    main()
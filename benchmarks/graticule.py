@@ -0,0 +1,74 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Per-frame time of the background of the display: painting the
+black background, the graticule and the tuning lines every frame, as
+_draw_cb did, against painting the cached layer.  The target is an
+offscreen ARGB32 cairo.ImageSurface the size of the display, not a
+window surface.  Needs pycairo and PyGObject, as the activity does. '''
+
+from gettext import gettext as _
+from types import SimpleNamespace
+
+from timing import best, report
+
+import cairo
+
+from drawwaveform import DrawWaveform
+
+WIDTH, HEIGHT = 1200, 900
+
+
+def display(tuner):
+    ''' Just the state of a DrawWaveform that _draw_background reads:
+    the grid alone, or the tuner on a guitar with harmonics '''
+    wave = SimpleNamespace(
+        _BACKGROUND_LINE_THICKNESS=0.8, _TUNING_LINE_THICKNESS=2,
+        _HARMONIC_LINE_THICKNESS=1, _tick_size=50, COLORS=DrawWaveform.COLORS,
+        context=tuner, active=tuner, fft_show=tuner, freq_div=50.0,
+        instrument=_('Guitar') if tuner else None, harmonics=tuner,
+        tuning_line=220.0 if tuner else 0.0)
+    wave._to_rgba = lambda colour: DrawWaveform._to_rgba(wave, colour)
+    wave.color = [wave._to_rgba('#FFFFFF')] * 2
+    return wave
+
+
+def main():
+    target = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+    cr = cairo.Context(target)
+    print('%dx%d ARGB32 image surface' % (WIDTH, HEIGHT))
+    for name, tuner in (('grid', False), ('tuner, guitar', True)):
+        wave = display(tuner)
+
+        def old():
+            DrawWaveform._draw_background(wave, cr, WIDTH, HEIGHT)
+            target.flush()
+
+        layer = target.create_similar(cairo.CONTENT_COLOR, WIDTH, HEIGHT)
+
+        def rebuild():
+            DrawWaveform._draw_background(wave, cairo.Context(layer),
+                                          WIDTH, HEIGHT)
+
+        rebuild()
+
+        def new():
+            cr.set_source_surface(layer, 0, 0)
+            cr.paint()
+            target.flush()
+
+        report('%s: drawn every frame' % (name), best(old))
+        report('%s: cached layer painted' % (name), best(new))
+        report('%s: layer rebuilt' % (name), best(rebuild))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Microseconds per note lookup over a log sweep from 20 Hz to 5 kHz:
+the scan of the 88 keys freq_note() and freq_index() did, against the
+table they use now.  The results of both are checked to be the same.
+Needs PyGObject and sugar3, as tuning_toolbar does. '''
+
+from time import perf_counter
+
+from timing import report
+
+import numpy as np
+
+from tuning_toolbar import A0, TWELTHROOT2, NOTES, FLAT, SHARP, SPAN, \
+    COLOR_RED, COLOR_YELLOW, style, note_octave, freq_note, freq_index
+
+SWEEP = np.exp(np.linspace(np.log(20), np.log(5000), 20000)).tolist()
+
+
+def old_freq_note(freq, flatsharp=False):
+    ''' freq_note() as it was, scanning the keys '''
+    if flatsharp:  # calculate if we are sharp or flat
+        for i in range(88):
+            f = A0 * pow(TWELTHROOT2, i)
+            if freq < f * 1.03 and freq > f * 0.97:
+                label = NOTES[i % 12] + str(int(i / 12))
+                if freq < f * 0.98:
+                    label = '%s %s %s' % (FLAT, label, FLAT)
+                    return SPAN % (COLOR_RED.get_html(), label)
+                elif freq < f * 0.99:
+                    label = '%s %s %s' % (FLAT, label, FLAT)
+                    return SPAN % (COLOR_YELLOW.get_html(), label)
+                elif freq > f * 1.02:
+                    label = '%s %s %s' % (SHARP, label, SHARP)
+                    return SPAN % (COLOR_RED.get_html(), label)
+                elif freq > f * 1.01:
+                    label = '%s %s %s' % (SHARP, label, SHARP)
+                    return SPAN % (COLOR_YELLOW.get_html(), label)
+                else:
+                    return SPAN % (style.COLOR_WHITE.get_html(), label)
+    else:
+        for i in range(88):
+            f = A0 * pow(TWELTHROOT2, i)
+            if freq < f * 1.03 and freq > f * 0.97:  # Found a match
+                return note_octave(NOTES[i % 12], int(i / 12))
+        return '?'
+
+
+def old_freq_index(freq):
+    ''' freq_index() as it was, scanning the keys '''
+    for i in range(88):
+        f = A0 * pow(TWELTHROOT2, i)
+        if freq < f * 1.03 and freq > f * 0.97:  # Found a match
+            return i
+    return 0
+
+
+def per_call(function, *args):
+    start = perf_counter()
+    for freq in SWEEP:
+        function(freq, *args)
+    return (perf_counter() - start) / len(SWEEP)
+
+
+def main():
+    for freq in SWEEP + [0.0, -5.0]:
+        assert old_freq_note(freq, True) == freq_note(freq, True), freq
+        assert old_freq_note(freq) == freq_note(freq), freq
+        assert old_freq_index(freq) == freq_index(freq), freq
+    print('Same results over %d frequencies' % (len(SWEEP)))
+    for name, old, new, args in (
+            ('freq_note(flatsharp)', old_freq_note, freq_note, (True,)),
+            ('freq_note', old_freq_note, freq_note, ()),
+            ('freq_index', old_freq_index, freq_index, ())):
+        report('%s: key scan' % (name), min(
+            per_call(old, *args) for i in range(5)), 'us')
+        report('%s: table' % (name), min(
+            per_call(new, *args) for i in range(5)), 'us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Accuracy, cost and latency of PitchDetector on synthetic tones from
+A0 to C8: pure sines, tones with four harmonics, and tones with
+harmonics in noise.  The error of the last reading is compared with
+that of the FFT peak interpolation audiograb used, on the last
+buffer. '''
+
+from timing import best, report
+
+import numpy as np
+
+from config import RATE
+from pitch import PitchDetector
+
+NOTES = [27.5, 41.2, 82.41, 110, 196, 261.63, 440, 659.26, 1046.5, 2093,
+         4186]
+BUFFER = 1600
+SECONDS = 0.5
+
+
+def _sample_frequency(data_buffer):
+    ''' The maximum frequency in the sample (as audiograb did) '''
+    buf = abs(np.fft.rfft(data_buffer))
+    maxi = buf.argmax()
+    if maxi == 0:
+        return 0.0
+    a, b, c = buf[maxi - 1], buf[maxi], buf[maxi + 1]
+    maxi -= a / float(a + b + c)
+    maxi += c / float(a + b + c)
+    return maxi * 48000 / (len(buf) * 2)
+
+
+def tone(frequency, seconds, harmonics=False, snr=None, seed=2):
+    ''' int16 samples of a tone, with harmonics and with white noise snr
+    dB below it if asked '''
+    t = np.arange(int(RATE * seconds)) / float(RATE)
+    x = np.sin(2 * np.pi * frequency * t)
+    if harmonics:
+        for k, a in ((2, 0.8), (3, 0.6), (4, 0.3), (5, 0.2)):
+            x += a * np.sin(2 * np.pi * k * frequency * t + k)
+    x /= abs(x).max()
+    if snr is not None:
+        noise = np.random.RandomState(seed).standard_normal(len(x))
+        x += noise * 10 ** (-snr / 20.0) / np.sqrt(2)
+    return (x * 10000).astype(np.int16)
+
+
+def feed(detector, samples):
+    for i in range(0, len(samples), BUFFER):
+        detector.feed(samples[i:i + BUFFER])
+
+
+def cents(found, frequency):
+    return abs(1200 * np.log2(found / frequency))
+
+
+def accuracy():
+    print('Error of the last reading, cents (no pitch: number of notes):')
+    print('%-20s %8s %8s %8s %10s %10s' % (
+        'tone', 'max', 'mean', 'no pitch', 'old max', 'old mean'))
+    for name, harmonics, snr in (('pure sine', False, None),
+                                 ('harmonics', True, None),
+                                 ('harmonics, 10 dB', True, 10),
+                                 ('harmonics, 0 dB', True, 0)):
+        errors, old_errors, silent = [], [], 0
+        for frequency in NOTES:
+            detector = PitchDetector(RATE)
+            samples = tone(frequency, SECONDS, harmonics, snr)
+            feed(detector, samples)
+            old = _sample_frequency(samples[-BUFFER:])
+            old_errors.append(cents(old, frequency) if old > 0 else np.inf)
+            if detector.frequency > 0:
+                errors.append(cents(detector.frequency, frequency))
+            else:
+                silent += 1
+        if errors:
+            print('%-20s %8.1f %8.1f %8d %10.0f %10.0f' % (
+                name, max(errors), np.mean(errors), silent,
+                max(old_errors), np.mean(old_errors)))
+        else:
+            print('%-20s %8s %8s %8d %10.0f %10.0f' % (
+                name, '-', '-', silent, max(old_errors),
+                np.mean(old_errors)))
+
+
+def latency(frequency=440.0, within=10.0):
+    ''' Time from the onset of a tone, after silence, until the reading
+    stays within some cents of it '''
+    detector = PitchDetector(RATE)
+    feed(detector, np.zeros(RATE // 2, dtype=np.int16))
+    samples = tone(frequency, SECONDS, True)
+    settled = None
+    for i in range(0, len(samples), BUFFER):
+        detector.feed(samples[i:i + BUFFER])
+        good = detector.frequency > 0 and \
+            cents(detector.frequency, frequency) <= within
+        if good and settled is None:
+            settled = i + BUFFER
+        elif not good:
+            settled = None
+    return settled
+
+
+def main():
+    accuracy()
+
+    detector = PitchDetector(RATE)
+    samples = tone(440, 2, True)
+    feed(detector, samples)
+    signal, recent = detector._signal.copy(), detector._recent.copy()
+    buffers = iter(range(0, 10 ** 9, BUFFER))
+
+    def one_buffer():
+        i = next(buffers) % (len(samples) - BUFFER)
+        detector.feed(samples[i:i + BUFFER])
+
+    analyses = detector.analyses
+    report('one analysis', best(lambda: detector.analyse(signal, recent)),
+           'us')
+    report('feeding a %d-sample buffer' % (BUFFER), best(one_buffer), 'us')
+    report('analyses per second of sound',
+           analyses / (len(samples) / float(RATE)), '/s')
+    settled = latency()
+    if settled is None:
+        print('440 Hz tone never settled within 10 cents')
+    else:
+        report('onset to within 10 cents, 440 Hz',
+               settled / float(RATE), 'ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Pitch and string tracking of 1 to 8 channels, in-process and with
+the process backend (one worker per channel).
+
+Throughput: 10 s of a 48 kHz tone is fed as fast as it goes, into
+rings that hold all of it, and the wall time to the last result is
+taken, as times real time.  With fewer cores than channels the workers
+share them, so this is where scaling with cores shows.
+
+Load: the same buffers arrive at real-time pace for 5 s, and the CPU
+time of the parent and of each worker (from /proc, so Linux only) is
+given as % of one core.
+
+Run with "taskset -c 0-N" to limit the cores used. '''
+
+from timing import report
+
+import os
+import sys
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from threading import Thread
+
+import numpy as np
+
+from pitch import PitchDetector, StringDetector
+from procpool import ChannelProcess
+
+RATE = 48000
+BUFFER = 1024
+SECONDS = 10
+PACED = 5
+GUITAR = [82.4069, 110, 146.832, 195.998, 246.942, 329.628]
+TICK = float(os.sysconf('SC_CLK_TCK'))
+
+
+def cpu_of(pid):
+    ''' CPU seconds used by a process so far '''
+    with open('/proc/%d/stat' % (pid)) as fd:
+        fields = fd.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / TICK
+
+
+def tone():
+    t = np.arange(RATE * SECONDS) / float(RATE)
+    return (8000 * np.sin(2 * np.pi * 110 * t)).astype(np.int16)
+
+
+def buffers(samples, seconds):
+    for k in range(int(seconds * RATE / BUFFER)):
+        start = (k * BUFFER) % (len(samples) - BUFFER)
+        yield k, samples[start:start + BUFFER]
+
+
+def in_process(samples, channels, paced):
+    pitch = [PitchDetector(RATE) for i in range(channels)]
+    strings = [StringDetector(GUITAR, RATE) for i in range(channels)]
+    seconds = PACED if paced else SECONDS
+    started = time.perf_counter()
+    cpu = time.process_time()
+    for k, buf in buffers(samples, seconds):
+        if paced:
+            _wait_for(started, k)
+        for i in range(channels):
+            pitch[i].feed(buf)
+            strings[i].feed(buf)
+    return time.perf_counter() - started, time.process_time() - cpu
+
+
+def _wait_for(started, k):
+    due = started + (k + 1) * BUFFER / float(RATE)
+    time.sleep(max(due - time.perf_counter(), 0))
+
+
+def with_processes(samples, channels, paced):
+    context = multiprocessing.get_context('forkserver')
+    length = RATE if paced else len(samples) + BUFFER
+    workers = [ChannelProcess(context, RATE, length)
+               for i in range(channels)]
+    for worker in workers:
+        worker.set_targets(GUITAR)
+        worker.feed(samples[:BUFFER])
+        worker._receive()
+    last = [time.perf_counter()]
+    running = [True]
+
+    def receive():
+        owners = dict((w.connection, w) for w in workers)
+        while running[0]:
+            for connection in wait(list(owners), 0.2):
+                owners[connection]._receive()
+                last[0] = time.perf_counter()
+    thread = Thread(target=receive)
+    thread.start()
+
+    before = [cpu_of(w.process.pid) for w in workers]
+    seconds = PACED if paced else SECONDS
+    started = time.perf_counter()
+    cpu = time.process_time()
+    for k, buf in buffers(samples, seconds):
+        if paced:
+            _wait_for(started, k)
+        for worker in workers:
+            worker.feed(buf)
+    parent = time.process_time() - cpu
+    while time.perf_counter() - last[0] < 1.0:
+        time.sleep(0.1)
+    wall = last[0] - started
+    used = [cpu_of(w.process.pid) - b for w, b in zip(workers, before)]
+    running[0] = False
+    thread.join()
+    skipped = sum(w.skipped for w in workers)
+    for worker in workers:
+        worker.stop()
+        worker.close()
+    return wall, parent, used, skipped
+
+
+def main():
+    cores = len(os.sched_getaffinity(0))
+    print('%d cores, %d s of %d Hz audio in %d-frame buffers'
+          % (cores, SECONDS, RATE, BUFFER))
+    samples = tone()
+    counts = [int(a) for a in sys.argv[1:]] or [1, 2, 4, 8]
+
+    print('throughput, times real time:')
+    for channels in counts:
+        wall, cpu = in_process(samples, channels, False)
+        report('%d channels in-process' % (channels), SECONDS / wall, 'x')
+        wall, parent, used, skipped = with_processes(
+            samples, channels, False)
+        report('%d channels in processes (%d skipped)'
+               % (channels, skipped), SECONDS / wall, 'x')
+
+    print('load at real-time pace, in % of a core:')
+    for channels in counts:
+        wall, cpu = in_process(samples, channels, True)
+        report('%d channels in-process' % (channels),
+               cpu / PACED * 100, '%')
+        wall, parent, used, skipped = with_processes(
+            samples, channels, True)
+        report('%d channels: parent' % (channels), parent / PACED * 100, '%')
+        report('%d channels: busiest worker' % (channels),
+               max(used) / PACED * 100, '%')
+        report('%d channels: all workers (%d skipped)'
+               % (channels, skipped), sum(used) / PACED * 100, '%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Microseconds per call to read a wrapped ring buffer decimated by
+step: RingBuffer1d.read, which concatenates the two sides of the wrap,
+against the RingBuffer2d readers.  Give "ring:step" pairs on the
+command line to choose the cases. '''
+
+import sys
+
+from timing import best
+
+import numpy as np
+
+from ringbuffer import RingBuffer1d, RingBuffer2d
+
+CASES = [(1000, 1), (100000, 1), (10000000, 1), (1000000, 4),
+         (10000000, 4), (10000000, 25000)]
+
+
+def _wrapped(length):
+    ''' Return a 1d and a 2d ring of int16 written one and a third times
+    over, so that every full read crosses the wrap '''
+    data = np.random.RandomState(1).randint(
+        -32768, 32767, length + length // 3).astype(np.int16)
+    ring1 = RingBuffer1d(length, dtype='int16')
+    ring2 = RingBuffer2d(1, length, dtype='int16')
+    for chunk in np.array_split(data, 4):
+        ring1.append(chunk)
+        ring2.append(chunk, channel=0)
+    return ring1, ring2
+
+
+def main():
+    cases = CASES
+    if len(sys.argv) > 1:
+        cases = [tuple(int(v) for v in arg.split(':'))
+                 for arg in sys.argv[1:]]
+
+    print('Wrapped int16 ring, us per call:')
+    print('%-10s %6s %9s %9s %10s %9s' % (
+        'ring', 'step', '1d read', '2d read', 'read_into', 'minmax'))
+    for length, step in cases:
+        ring1, ring2 = _wrapped(length)
+        count = length // step
+        out = np.empty(count, dtype='int16')
+        out_max = np.empty(count, dtype='int16')
+        number = max(1, min(1000, 10000000 // length))
+        times = [best(lambda: ring1.read(None, step), number),
+                 best(lambda: ring2.read(None, step), number),
+                 best(lambda: ring2.read_into(out, 0, None, step), number),
+                 best(lambda: ring2.read_minmax_into(out, out_max, 0, None,
+                                                     step), number)]
+        print('%-10d %6d %9.1f %9.1f %10.1f %9.1f' % (
+            (length, step) + tuple(t * 1e6 for t in times)))
+
+
+if __name__ == '__main__':
+    main()
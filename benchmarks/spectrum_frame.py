@@ -0,0 +1,62 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Spectra per second for one graph: the per-frame FFT code _draw_cb
+used, from a RingBuffer1d read to the scaled magnitude, against
+SpectrumEngine.transform_ring on a RingBuffer2d.  Also prints the peak
+bin and height of a sine both ways. '''
+
+from timing import best, report
+
+import numpy as np
+
+from ringbuffer import RingBuffer1d, RingBuffer2d
+from spectrum import SpectrumEngine
+
+CASES = [(480, 1), (480, 4), (4096, 1), (4096, 4)]
+
+
+def main():
+    for size, step in CASES:
+        length = size * step
+        sine = (8000 * np.sin(2 * np.pi * 0.01 * np.arange(2 * length)))
+        sine = sine.astype(np.int16)
+        ring1 = RingBuffer1d(length, dtype='int16')
+        ring1.append(sine)
+        ring2 = RingBuffer2d(1, length, dtype='int16')
+        ring2.append(sine, channel=0)
+        window = np.blackman(size)
+
+        def old():
+            # As _draw_cb did, including the product it threw away
+            buf = ring1.read(None, step)
+            np.multiply(buf.astype(np.float64), window,
+                        buf.astype(np.float64))
+            fftx = np.fft.rfft(buf)
+            fftx = abs(fftx)
+            return np.multiply(fftx, 0.02, fftx)
+
+        engine = SpectrumEngine(size)
+
+        def new():
+            data = engine.transform_ring(ring2, 0, step)
+            return np.multiply(data, 0.02 * size, out=data)
+
+        before, after = old(), new()
+        print('size %d, step %d: peak bin %d / %d, height %.4g / %.4g'
+              % (size, step, before.argmax(), after.argmax(), before.max(),
+                 after.max()))
+        report('  per-frame code', 1.0 / best(old, 1000), 'frames/s')
+        report('  SpectrumEngine', 1.0 / best(new, 1000), 'frames/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Helpers shared by the benchmark scripts.  Run a script from the top
+of the bundle, e.g. "python3 benchmarks/trace_render.py". '''
+
+import os
+import sys
+import time
+
+# The activity's modules sit at the top of the bundle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+
+def best(function, number=100, repeat=7):
+    ''' The best time of repeat runs of number calls, in seconds per
+    call '''
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def report(name, value, unit='ms'):
+    ''' Print a result; a time in seconds is given in ms, s or us, and
+    any other unit as it is '''
+    value *= {'s': 1.0, 'ms': 1e3, 'us': 1e6}.get(unit, 1.0)
+    print('%-44s %12.5g %s' % (name, value, unit))
@@ -0,0 +1,99 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+''' Frame time of a trace: the cairo polyline stroke the display used
+to draw, against TraceRenderer, onto a real offscreen ARGB32
+cairo.ImageSurface the size of the display.  TraceRenderer is timed
+whole, then split into its numpy rasterisation and the mask_surface()
+composite.  Needs pycairo and PyGObject, as the activity does. '''
+
+from timing import best, report
+
+import cairo
+import numpy as np
+
+from drawwaveform import TraceRenderer
+
+WIDTH, HEIGHT = 1200, 900
+THICKNESS = 6
+POINTS = 400
+
+
+class Color():
+    red, green, blue = 0.7, 0.0, 0.03
+
+
+def traces():
+    xs = np.arange(POINTS) * (WIDTH / float(POINTS))
+    phase = np.arange(POINTS) / 20.0
+    sine = HEIGHT / 2 + 200 * np.sin(phase)
+    noise = np.random.RandomState(1).uniform(0, HEIGHT, POINTS)
+    return [('sine', xs, sine, None),
+            ('noise, full height', xs, noise, None),
+            ('flat line', xs, np.full(POINTS, HEIGHT / 2.0), None),
+            ('envelope band', xs, sine - 30, sine + 30)]
+
+
+def stroke(cr, xs, top, bottom):
+    ''' The polyline, one cairo call per point, as drawn before '''
+    cr.set_line_width(THICKNESS)
+    cr.set_source_rgb(Color.red, Color.green, Color.blue)
+    cr.move_to(xs[0], top[0])
+    for x, y in zip(xs[1:].tolist(), top[1:].tolist()):
+        cr.line_to(x, y)
+    if bottom is not None:
+        for x, y in zip(xs[::-1].tolist(), bottom[::-1].tolist()):
+            cr.line_to(x, y)
+        cr.close_path()
+        cr.fill_preserve()
+    cr.stroke()
+
+
+def main():
+    target = cairo.ImageSurface(cairo.FORMAT_ARGB32, WIDTH, HEIGHT)
+    cr = cairo.Context(target)
+    print('%dx%d ARGB32 image surface, %d points, %d px line'
+          % (WIDTH, HEIGHT, POINTS, THICKNESS))
+    for name, xs, top, bottom in traces():
+        def old():
+            stroke(cr, xs, top, bottom)
+            target.flush()
+
+        renderer = TraceRenderer(WIDTH, HEIGHT)
+
+        def new():
+            renderer.draw(cr, Color, THICKNESS, xs, top, bottom)
+            target.flush()
+
+        def composite():
+            x, y, width, height = renderer._band
+            cr.save()
+            cr.rectangle(x, y, width, height)
+            cr.clip()
+            cr.set_source_rgb(Color.red, Color.green, Color.blue)
+            cr.mask_surface(renderer.surface, 0, 0)
+            cr.restore()
+            target.flush()
+
+        def whole_composite():
+            cr.set_source_rgb(Color.red, Color.green, Color.blue)
+            cr.mask_surface(renderer.surface, 0, 0)
+            target.flush()
+
+        report('%s: cairo stroke' % (name), best(old))
+        report('%s: TraceRenderer.draw' % (name), best(new))
+        report('%s:   of which band composite' % (name), best(composite))
+        report('%s:   whole surface composite' % (name),
+               best(whole_composite))
+
+
+if __name__ == '__main__':
+    main()
@@ -47,14 +47,126 @@ BIAS = True
 # Interval, in ms, after which audio buffer will be sent to drawing class
 AUDIO_BUFFER_TIMEOUT = 30
 
+# Capture pipeline layout for multi-channel hardware:
+# 'interleaved' - a single sink; channels are split with numpy views
+# 'deinterleave' - a deinterleave element with a queue and sink per channel
+CAPTURE_INTERLEAVED = 'interleaved'
+CAPTURE_DEINTERLEAVE = 'deinterleave'
+CAPTURE_LAYOUT = CAPTURE_INTERLEAVED
+
+# Capture sink of the interleaved pipeline:
+# 'appsink' - buffers are pulled in batches from the main loop every
+#     AUDIO_BUFFER_TIMEOUT ms
+# 'fakesink' - a handoff signal per buffer on the streaming thread
+CAPTURE_APPSINK = 'appsink'
+CAPTURE_FAKESINK = 'fakesink'
+CAPTURE_SINK = CAPTURE_APPSINK
+
+# Buffers the appsink holds for us; when full, the oldest are dropped
+# (APPSINK_DROP) or the pipeline blocks until we catch up
+APPSINK_MAX_BUFFERS = 16
+APPSINK_DROP = True
+
+# How the mixer controls are read and set:
+# 'alsaaudio' - pyalsaaudio, within the activity, when it is installed
+# 'amixer' - the amixer command, run once for all the controls read,
+#     and once for each batch of changes
+MIXER_ALSAAUDIO = 'alsaaudio'
+MIXER_AMIXER = 'amixer'
+MIXER_BACKEND = MIXER_ALSAAUDIO
+
 # When Activity quits
 QUIT_MIC_BOOST = False
 QUIT_DC_MODE_ENABLE = False
 QUIT_CAPTURE_GAIN = 100
 QUIT_BIAS = True
 
-# Maximum no. of data samples Measure will save
-MAX_LOG_ENTRIES = 1000
+# Readings held in memory per chunk of a logging session, and the
+# number of chunks that may wait to be written to disk
+LOG_CHUNK = 4096
+LOG_CHUNKS = 4
+
+# Buffers of raw samples that may wait to be written to a recording
+# before further buffers are dropped
+RECORD_QUEUE = 64
+
+# Buffers that may wait for the analysis worker (pitch tracking and
+# logging) before the oldest are dropped
+ANALYSIS_QUEUE = 32
+
+# Track the pitch (and strings) of each channel in a process of its
+# own, on as many cores, instead of on the analysis worker thread; the
+# spectrum and the logging statistics are not moved.  The seconds of
+# samples the shared memory of each holds, and how processes start
+ANALYSIS_PROCESSES = False
+ANALYSIS_RING = 1.0
+ANALYSIS_START_METHOD = 'forkserver'
+
+# Frames per buffer fed from a recording, and milliseconds between
+# feeds when playing it in real time
+PLAYBACK_BUFFER = 1024
+PLAYBACK_INTERVAL = 20
+
+# Seconds of samples summarised by each logged reading
+LOG_WINDOW = 0.02
+
+# Decimation step of the time base from which the display plots the
+# min/max envelope of each pixel column instead of every Nth sample.
+# That is a third of a millisecond per point at 48 kHz, slower than any
+# time base of the slider (which stops at a step of 3): only there does
+# the stride hide whole glitches, and the raw window grow long.
+ENVELOPE_MIN_STEP = 16
+
+# Spectrum averaging: time constant, in seconds, of the exponential
+# average of overlapping segments (0 shows one snapshot per frame), the
+# overlap of consecutive segments, and the seconds of samples kept so
+# that no segment is lost between two frames
+SPECTRUM_AVERAGE_TIME = 0.5
+SPECTRUM_OVERLAP = 0.5
+SPECTRUM_BACKLOG = 0.25
+
+# Decibels below a full scale sine that the spectrogram can show
+SPECTROGRAM_RANGE = 80
+
+# Pitch detection: decimation of the stream, frame and hop in
+# decimated samples, YIN threshold, and the range searched, in Hz
+PITCH_DECIMATION = 4
+PITCH_FRAME = 1024
+PITCH_HOP = 256
+PITCH_THRESHOLD = 0.15
+PITCH_MIN = 27.5
+PITCH_MAX = 4200.0
+
+# Pitches above PITCH_SPLIT, in Hz, are looked for at the full rate, in
+# the last PITCH_FINE_FRAME samples, as their periods are too few
+# decimated samples long.  Those samples are first low-passed just above
+# PITCH_MAX with PITCH_FINE_TAPS taps, to keep out the noise above it.
+PITCH_SPLIT = 1000.0
+PITCH_FINE_FRAME = 512
+PITCH_FINE_TAPS = 65
+
+# Tuning all the strings of an instrument at once: decimation, frame and
+# hop in decimated samples, the harmonics looked at, how far (in cents)
+# from each string to look, and how far above the median of the
+# spectrum a peak must be to count
+PITCH_STRING_DECIMATION = 8
+PITCH_STRING_FRAME = 4096
+PITCH_STRING_HOP = 512
+PITCH_HARMONICS = 3
+PITCH_STRING_SPAN = 100
+PITCH_STRING_SNR = 8.0
+
+# Frames the trigger searches at a time; the hysteresis of the trigger,
+# as a fraction of the height of the graph, and its holdoff in seconds
+TRIGGER_CHUNK = 4096
+TRIGGER_HYSTERESIS = 0.02
+TRIGGER_HOLDOFF = 0.0
+
+# Most frames per second the display draws; frames are only drawn when
+# new samples arrived or a setting changed
+MAX_FPS = 30
+# Pace frames with the Gdk frame clock (True) or with a GLib timeout
+USE_FRAME_CLOCK = True
 
 # Duty cycle of display value update
 DISPLAY_DUTY_CYCLE = 100
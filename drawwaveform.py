@@ -16,14 +16,20 @@
 # Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
 
 
-from gi.repository import Gdk, Gtk
+from gi.repository import Gdk, GLib, Gtk
+import cairo
 from math import floor, ceil
-from numpy import array, where, int16, float64, multiply, fft, arange, blackman
-from ringbuffer import RingBuffer1d
-
-from config import MAX_GRAPHS, RATE, UPPER
+from numpy import array, int16, uint8, uint16, float64, multiply, \
+    arange, interp, minimum, maximum, zeros, clip, rint, \
+    subtract, less_equal, empty, intp, cumsum, repeat
+from ringbuffer import RingBuffer2d, EnvelopeBuffer
+from trigger import EdgeTrigger, Acquisition
+from spectrum import SpectrumEngine, AveragedSpectrum, Spectrogram
+
+from config import MAX_GRAPHS, RATE, UPPER, ENVELOPE_MIN_STEP, \
+    MAX_FPS, USE_FRAME_CLOCK, SPECTRUM_AVERAGE_TIME, SPECTRUM_BACKLOG, \
+    TRIGGER_HYSTERESIS, TRIGGER_HOLDOFF
 from config import INSTRUMENT_DICT
-from tuning_toolbar import A0, C8, freq_note
 
 # Initialize logging.
 import logging
@@ -31,6 +37,138 @@ log = logging.getLogger('measure-activity')
 log.setLevel(logging.DEBUG)
 
 
+class TraceRenderer(object):
+    """ Rasterises traces into an A8 mask with numpy, one span of rows
+    per pixel column, and paints the mask in the trace colour with a
+    single cairo call, instead of one cairo call per plotted point.
+    Only the band of the mask a trace lights is cleared, written and
+    painted.  A pixel is either lit or not: unlike a cairo stroke, the
+    trace is not antialiased. """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        stride = cairo.ImageSurface.format_stride_for_width(
+            cairo.FORMAT_A8, width)
+        self.pixels = zeros((height, stride), dtype=uint8)
+        self.surface = cairo.ImageSurface.create_for_data(
+            self.pixels, cairo.FORMAT_A8, width, height, stride)
+        self._rows = arange(height, dtype=int16)[:, None]
+        self._band = None  # (x, y, width, height) lit in the mask
+        self._index = None  # or, for a thin trace, its pixels
+
+    def spans(self, xs, top, bottom=None):
+        """ Return the first pixel column a trace crosses and, for each
+        column from there, the lowest and highest y the trace reaches.
+        The trace is the polyline through (xs, top), or the band between
+        (xs, top) and (xs, bottom). """
+        if bottom is None:
+            bottom = top
+        first = max(int(floor(xs[0])), 0)
+        last = min(int(ceil(xs[-1])), self.width)
+        if last <= first:
+            return first, None, None
+
+        # Where the trace enters and leaves each column...
+        edges = arange(first, last + 1, dtype=float64)
+        upper = interp(edges, xs, top)
+        lower = interp(edges, xs, bottom)
+        low = minimum(minimum(upper[:-1], upper[1:]),
+                      minimum(lower[:-1], lower[1:]))
+        high = maximum(maximum(upper[:-1], upper[1:]),
+                       maximum(lower[:-1], lower[1:]))
+
+        # ...and every vertex inside it, for dense traces
+        columns = xs.astype(int) - first
+        inside = (columns >= 0) & (columns < last - first)
+        minimum.at(low, columns[inside], minimum(top, bottom)[inside])
+        maximum.at(high, columns[inside], maximum(top, bottom)[inside])
+        return first, low, high
+
+    def draw(self, cr, color, thickness, xs, top, bottom=None):
+        """ Paint a trace (or a band) of the given thickness """
+        first, low, high = self.spans(xs, top, bottom)
+        if low is None:
+            return
+        half = thickness / 2.0
+
+        # The rows of each column whose centres the trace covers, as a
+        # first row and a count; empty columns start below the image
+        start = clip(rint(low - half), 0, self.height)
+        count = clip(rint(high + half), 0, self.height) - start - 1
+        lit = count >= 0
+        start[~lit] = self.height + 1
+        start = start.astype(int16)
+        count = clip(count, 0, None).astype(uint16)
+
+        # The band of the mask lit now, and how many pixels it lights
+        band = None
+        if lit.any():
+            top_row = int(start[lit].min())
+            bottom_row = min(int((start[lit] + count[lit]).max()) + 1,
+                             self.height)
+            band = (first, top_row, len(low), bottom_row - top_row)
+            lengths = count[lit].astype(intp) + 1
+            sparse = lengths.sum() * 16 < band[2] * band[3]
+
+        # Of what was lit last time, only what the new band does not
+        # overwrite whole is cleared
+        self.surface.flush()
+        if self._band is not None:
+            self._clear(None if band is None or sparse else band)
+        self._band = band
+        self._index = None
+        if band is None:
+            return
+
+        if sparse:
+            # A thin trace lights few pixels of its band: they are set
+            # one by one, a column of lengths at a time, in the flat mask
+            stride = self.pixels.shape[1]
+            ends = cumsum(lengths)
+            tops = start[lit].astype(intp) * stride + \
+                arange(first, first + len(low))[lit]
+            index = repeat(tops - (ends - lengths) * stride, lengths)
+            index += arange(ends[-1]) * stride
+            self.pixels.reshape(-1)[index] = 255
+            self._index = index
+        else:
+            # A row is lit when (row - start), wrapped to unsigned, is
+            # within the count: a single comparison per pixel of the band
+            region = self.pixels[top_row:bottom_row,
+                                 first:first + len(low)]
+            offsets = subtract(self._rows[top_row:bottom_row], start,
+                               dtype=int16).view(uint16)
+            less_equal(offsets, count, out=region.view(bool))
+            multiply(region, 255, out=region)
+        self.surface.mark_dirty_rectangle(*self._band)
+
+        cr.save()
+        cr.rectangle(*self._band)
+        cr.clip()
+        cr.set_source_rgb(color.red, color.green, color.blue)
+        cr.mask_surface(self.surface, 0, 0)
+        cr.restore()
+
+    def _clear(self, new):
+        """ Clear what was lit in the mask, except where the new band
+        covers it """
+        x, y, width, height = self._band
+        if self._index is not None:
+            self.pixels.reshape(-1)[self._index] = 0
+        elif new is None:
+            self.pixels[y:y + height, x:x + width] = 0
+        else:
+            left, top, right, bottom = new[0], new[1], \
+                new[0] + new[2], new[1] + new[3]
+            self.pixels[y:min(top, y + height), x:x + width] = 0
+            self.pixels[max(bottom, y):y + height, x:x + width] = 0
+            rows = slice(max(top, y), min(bottom, y + height))
+            self.pixels[rows, x:min(left, x + width)] = 0
+            self.pixels[rows, max(right, x):x + width] = 0
+        self.surface.mark_dirty_rectangle(x, y, width, height)
+
+
 class DrawWaveform(Gtk.DrawingArea):
     """ Handles all the drawing of waveforms """
 
@@ -62,11 +200,21 @@ class DrawWaveform(Gtk.DrawingArea):
 
         self.active = False
 
+        # Frame pacing: new_buffer only raises _dirty, since it may run
+        # on a streaming thread, and the pacing callback draws from it.
+        # The callback goes while nothing is new, so that the frame
+        # clock can stop, and new_buffer wakes it through the main loop.
+        self._dirty = False
+        self._pacing = False
+        self._waking = False
+        self._frame_id = None
+        self._last_frame = 0
+        self._frame_interval = 1000000 // MAX_FPS
+
         self.buffers = array([])
         self.main_buffers = array([])
         self.str_buffer = ''
         self.peaks = []
-        self.fftx = []
 
         self._tick_size = 50
 
@@ -102,6 +250,8 @@ class DrawWaveform(Gtk.DrawingArea):
         self.scaleY = ""
 
         self._back_surf = None
+        self._back_key = None
+        self._renderer = None
 
         self.pr_time = 0
         self.MAX_GRAPHS = MAX_GRAPHS     # Maximum simultaneous graphs
@@ -142,7 +292,16 @@ class DrawWaveform(Gtk.DrawingArea):
             self.visibility.append(True)
             self.graph_id.append(x)
 
-        self.ringbuffer = []
+        self.ringbuffer = RingBuffer2d(0, self.max_samples, dtype=int16)
+        self._triggers = []
+        self.acquisition = Acquisition()
+        self.acquire_mode = Acquisition.AUTO
+        self.envelope = None
+        self.spectrum = None
+        self._spectrum_key = None
+        self.spectrum_average = SPECTRUM_AVERAGE_TIME
+        self.spectrogram_show = False
+        self._spectrogram_masks = []
 
         self._size_allocate_id = self.connect('size-allocate',
                                               self._size_allocate_cb)
@@ -170,9 +329,10 @@ class DrawWaveform(Gtk.DrawingArea):
                 self.color[i] = self._to_rgba('#FFFFFF')
             self.source[i] = 0
 
+        self.ringbuffer = RingBuffer2d(self.channels, self.max_samples,
+                                       dtype=int16)
+        self._triggers = [EdgeTrigger() for i in range(self.channels)]
         for i in range(self.channels):
-            self.ringbuffer.append(RingBuffer1d(self.max_samples,
-                                                dtype=int16))
             self.y_mag.append(3.0)
             self.gain.append(1.0)
             self.bias.append(0)
@@ -182,16 +342,23 @@ class DrawWaveform(Gtk.DrawingArea):
         """ Maximum no. of samples in ringbuffer """
         if self.max_samples == num:
             return
-        for i in range(self.channels):
-            new_buffer = RingBuffer1d(num, dtype=int16)
-            new_buffer.append(self.ringbuffer[i].read())
-            self.ringbuffer[i] = new_buffer
+        self.ringbuffer = self.ringbuffer.resized(num)
         self.max_samples = num
         return
 
     def new_buffer(self, buf, channel=0):
-        """ Append a new buffer to the ringbuffer """
-        self.ringbuffer[channel].append(buf)
+        """ Append a new buffer to the ringbuffer; with channel=None
+        the buffer holds interleaved frames of every channel """
+        self.ringbuffer.append(buf, channel=channel)
+        envelope = self.envelope
+        if envelope is not None:
+            envelope.append(buf, channel=channel)
+        acquisition = self.acquisition
+        if acquisition.mode == Acquisition.AUTO:
+            self._wake_frames()
+        elif acquisition.process(self.ringbuffer):
+            # Show each window captured once
+            self._wake_frames()
         return True
 
     def set_context_on(self):
@@ -213,6 +380,7 @@ class DrawWaveform(Gtk.DrawingArea):
     def set_invert_state(self, invert_state, channel=0):
         """ In sensor mode, we can invert the plot """
         self.invert[channel] = invert_state
+        self._flush_redraw()
         return
 
     def get_invert_state(self, channel=0):
@@ -226,66 +394,177 @@ class DrawWaveform(Gtk.DrawingArea):
 
     def _size_allocate_cb(self, widget, allocation):
         """ Allocate a drawing area for the plot """
+        self._back_surf = None
         self._update_mode()
         return
 
     def _flush_redraw(self):
-        Gdk.flush()
+        """ Redraw after a change of settings: on the next paced frame
+        while running, at once otherwise """
+        if self._pacing:
+            self._wake_frames()
+        else:
+            self._dirty = True
+            self.queue_draw()
+
+    def _start_frames(self):
+        """ Start pacing redraws at no more than MAX_FPS """
+        self._pacing = True
+        self._add_frames()
+
+    def _add_frames(self):
+        if self._frame_id is not None:
+            return
+        if USE_FRAME_CLOCK:
+            self._frame_id = self.add_tick_callback(self._tick_cb, None)
+        else:
+            self._frame_id = GLib.timeout_add(1000 // MAX_FPS,
+                                              self._timeout_cb)
+
+    def _stop_frames(self):
+        self._pacing = False
+        if self._frame_id is None:
+            return
+        if USE_FRAME_CLOCK:
+            self.remove_tick_callback(self._frame_id)
+        else:
+            GLib.source_remove(self._frame_id)
+        self._frame_id = None
+
+    def _wake_frames(self):
+        """ There is something new to draw: have the pacing callback
+        added back if it went.  May be called from any thread """
+        self._dirty = True
+        if self._pacing and self._frame_id is None and not self._waking:
+            self._waking = True
+            GLib.idle_add(self._wake_cb)
+
+    def _wake_cb(self):
+        self._waking = False
+        if self._pacing:
+            self._add_frames()
+        return False
+
+    def _idle_frames(self):
+        """ Nothing new: remove the pacing callback, unless a buffer
+        came in meanwhile; returns whether to keep it """
+        frame_id, self._frame_id = self._frame_id, None
+        if self._dirty:
+            self._frame_id = frame_id
+            return True
+        return False
+
+    def _tick_cb(self, widget, frame_clock, data=None):
+        """ Draw on this frame of the clock if there is something new
+        and the previous frame is old enough """
+        if not self._dirty:
+            return self._idle_frames()
+        now = frame_clock.get_frame_time()
+        # Allow a millisecond of jitter, so that a 30 FPS cap on a
+        # 60 Hz display draws every other frame rather than every third
+        if now - self._last_frame >= self._frame_interval - 1000:
+            self._dirty = False
+            self._last_frame = now
+            self.queue_draw()
+        return True
+
+    def _timeout_cb(self):
+        """ Draw if there is something new """
+        if not self._dirty:
+            return self._idle_frames()
+        self._dirty = False
         self.queue_draw()
+        return True
 
     def do_button_press_event(self, event):
         """ Set the trigger position on a button-press event """
         self.trigger_xpos = event.x / float(self.get_allocated_width())
         self.trigger_ypos = event.y / float(self.get_allocated_height())
+        self._flush_redraw()
         return True
 
-    def _calculate_trigger_position(self, samples, y_mag, buf):
-        ''' If there is a trigger, we need to calculate an offset '''
+    def _trigger_settings(self, graph_id):
+        ''' The edge, level, hysteresis and holdoff of the trigger of a
+        channel, on the scale of its samples '''
+        y_mag = self.y_mag[graph_id]
+        scale = -32767.0 / (0.01 if y_mag == 0 else y_mag)
+        if self.triggering == self.TRIGGER_POS:
+            edge = EdgeTrigger.RISING
+        else:
+            edge = EdgeTrigger.FALLING
+        return (edge, (self.trigger_ypos - 0.5) * scale,
+                TRIGGER_HYSTERESIS * scale,
+                TRIGGER_HOLDOFF * self._input_freq)
+
+    def _configure_acquisition(self, samples):
+        ''' Hand the acquisition the trigger and the window shown, of
+        samples (after input_step) with the trigger at trigger_xpos '''
+        acquisition = self.acquisition
+        if self.fft_show or self.triggering == self.TRIGGER_NONE or \
+                acquisition.channel >= self.channels:
+            mode = Acquisition.AUTO
+        else:
+            mode = self.acquire_mode
+        samples_to_end = int(samples * (1 - self.trigger_xpos))
+        acquisition.configure(
+            mode, *self._trigger_settings(acquisition.channel),
+            pre=(samples - samples_to_end) * self.input_step,
+            post=(samples_to_end + 2) * self.input_step)
+
+    def _read_triggered(self, graph_id, samples):
+        ''' Read the samples of a channel to show, with the last trigger
+        at the trigger position; returns them and the x offset that puts
+        the crossing exactly under the trigger, or None when the ring
+        buffer does not hold them '''
+        step = self.input_step
         xpos = self.trigger_xpos
-        ypos = self.trigger_ypos
         samples_to_end = int(samples * (1 - xpos))
 
-        ypos -= 0.5
-        if y_mag == 0:
-            ypos *= -32767.0 / 0.01
+        acquisition = self.acquisition
+        if acquisition.mode != Acquisition.AUTO:
+            # The window captured around the last trigger, if any
+            window = acquisition.captured
+            if window is None or graph_id >= len(window):
+                return None
+            data = window[graph_id, ::step][:samples + 2].astype(float64)
+            fraction = acquisition.fraction
         else:
-            ypos *= -32767.0 / y_mag
-
+            trigger = self._triggers[graph_id]
+            trigger.configure(*self._trigger_settings(graph_id))
+
+            # A trigger must have samples_to_end samples to show after it
+            after = (samples_to_end + 2) * step
+            written = self.ringbuffer.written(graph_id)
+            position = trigger.update(self.ringbuffer, graph_id,
+                                      written - after)
+            data = empty(samples + 2, dtype=float64)
+            if position is None:
+                # Nothing to trigger on: show the newest samples
+                if self.ringbuffer.read_into(data, graph_id,
+                                             step=step) is None:
+                    return None
+                return data, 0
+
+            first = int(floor(position))
+            if self.ringbuffer.read_into(data, graph_id, first + after,
+                                         step) is None:
+                return None
+            fraction = position - first
         x_offset = self.get_allocated_width() * xpos - \
-            (samples - samples_to_end) * self.draw_interval
-
-        position = -1
-        if self.triggering == self.TRIGGER_POS:
-            sams = buf[samples - samples_to_end: - samples_to_end - 3]
-            ints = sams <= ypos
-            sams = buf[samples - samples_to_end + 1: - samples_to_end - 2]
-            ints &= sams > ypos
-            ints = where(ints)[0]
-            if len(ints) > 0:
-                position = max(position, ints[-1])
-        elif self.triggering == self.TRIGGER_NEG:
-            sams = buf[samples - samples_to_end: - samples_to_end - 3]
-            ints = sams >= ypos
-            sams = buf[samples - samples_to_end + 1: - samples_to_end - 2]
-            ints &= sams < ypos
-            ints = where(ints)[0]
-            if len(ints) > 0:
-                position = max(position, ints[-1])
-
-        if position == -1:
-            position = len(buf) - samples_to_end - 2
-        else:
-            position = position + samples - samples_to_end
-            x_offset -= int(
-                (float(-buf[position] + ypos) /
-                 (buf[position + 1] - buf[position])) *
-                self.draw_interval + 0.5)
-        return position, samples_to_end
-
-    def _draw_cb(self, widget, cr):
-        w = self.get_allocated_width()
-        h = self.get_allocated_height()
-
+            (samples - samples_to_end + fraction / step) * \
+            self.draw_interval
+        return data, x_offset
+
+    def _background_key(self, w, h):
+        ''' Everything the background layer depends on '''
+        if not (self.context and self.active and self.fft_show):
+            return (w, h, self._tick_size)
+        return (w, h, self._tick_size, self.freq_div, self.instrument,
+                self.tuning_line, self.harmonics, self.color[0],
+                self.color[1])
+
+    def _draw_background(self, cr, w, h):
+        ''' Paint the background, graticule and tuning lines '''
         # black background
         cr.set_source_rgb(0, 0, 0)
         cr.paint()
@@ -314,10 +593,8 @@ class DrawWaveform(Gtk.DrawingArea):
 
         cr.stroke()
 
-        # Real time drawing
+        # Tuning lines
         if self.context and self.active:
-
-            # Draw tuning lines
             # If we are tuning, we want to scale by 10
             scale = 10. * self.freq_div / 500.
             if self.fft_show and self.instrument in INSTRUMENT_DICT:
@@ -359,46 +636,82 @@ class DrawWaveform(Gtk.DrawingArea):
                         cr.line_to(x * j, h)
                     cr.stroke()
 
+    def _draw_cb(self, widget, cr):
+        w = self.get_allocated_width()
+        h = self.get_allocated_height()
+
+        # Grid and tuning lines, from the cached layer
+        key = self._background_key(w, h)
+        if self._back_surf is None or self._back_key != key:
+            self._back_surf = cr.get_target().create_similar(
+                cairo.CONTENT_COLOR, w, h)
+            self._back_key = key
+            self._draw_background(cairo.Context(self._back_surf), w, h)
+        cr.set_source_surface(self._back_surf, 0, 0)
+        cr.paint()
+
+        # Real time drawing
+        if self.context and self.active:
+            if not self.fft_show:
+                self._configure_acquisition(int(ceil(w / self.draw_interval)))
+            else:
+                self._configure_acquisition(0)
+
+            # Tuning every string of an instrument at once; the readout
+            # of the strings then takes the place of that of the pitch
+            tuning_strings = self.fft_show and \
+                self.instrument in INSTRUMENT_DICT
+            if tuning_strings:
+                self.activity.tuning_toolbar.show_strings(
+                    INSTRUMENT_DICT[self.instrument],
+                    self.activity.audiograb.get_strings())
+
             # Iterate for each graph
             for graph_id in self.graph_id:
                 if not self.visibility[graph_id]:
                     continue
+                if self.fft_show and self.spectrogram_show:
+                    if self.graph_show_state[graph_id]:
+                        self._draw_spectrogram(cr, graph_id)
+                    continue
                 if self.graph_show_state[graph_id]:
-                    buf = self.ringbuffer[graph_id].read(None, self.input_step)
-                    samples = int(ceil(w / self.draw_interval))
-                    if len(buf) == 0:
-                        # We don't have enough data to plot.
-                        self._flush_redraw()
-                        return
-
                     x_offset = 0
-                    if not self.fft_show:
+                    envelope = self.envelope
+                    low = None
+                    if envelope is not None and not self.fft_show:
+                        columns = envelope.read(graph_id)
+                        if columns is None:
+                            # We don't have enough data to plot.
+                            return
+                        low = columns[0].astype(float64)
+                        data = columns[1].astype(float64)
+                    elif self.fft_show:
+                        data = self.spectrum.transform_ring(
+                            self.ringbuffer, graph_id, self.input_step)
+                        if data is None:
+                            # We don't have enough data to plot.
+                            return
+                        # On the scale of the old unwindowed spectrum
+                        multiply(data, 0.02 * self.spectrum.size, out=data)
+                    else:
+                        samples = int(ceil(w / self.draw_interval))
                         if self.triggering != self.TRIGGER_NONE:
-                            position, samples_to_end = \
-                                self._calculate_trigger_position(
-                                    samples, self.y_mag[graph_id], buf)
-                            sams = buf[position - samples + samples_to_end:
-                                       position + samples_to_end + 2]
+                            triggered = self._read_triggered(graph_id,
+                                                             samples)
                         else:
-                            sams = buf[-samples:]
-                        data = sams.astype(float64)
-
-                    else:
-                        # FFT
-                        try:
-                            # Multiply input with the window
-                            multiply(buf.astype(float64), self.fft_window,
-                                     buf.astype(float64))
-
-                            # Should be fast enough even without pow(2) stuff.
-                            self.fftx = fft.rfft(buf)
-                            self.fftx = abs(self.fftx)
-                            data = multiply(self.fftx, 0.02, self.fftx)
-                        except ValueError:
-                            # TODO: Figure out how this can happen.
-                            #       Shape mismatch between window and buf
-                            self._flush_redraw()
-                            return True
+                            data = empty(samples, dtype=float64)
+                            triggered = data, 0
+                            if self.ringbuffer.read_into(
+                                    data, graph_id,
+                                    step=self.input_step) is None:
+                                triggered = None
+                        if triggered is None:
+                            if self.acquisition.mode != Acquisition.AUTO:
+                                # Waiting for a trigger
+                                continue
+                            # We don't have enough data to plot.
+                            return
+                        data, x_offset = triggered
 
                     # Scaling the values
                     if self.activity.CONTEXT == 'sensor':
@@ -408,34 +721,28 @@ class DrawWaveform(Gtk.DrawingArea):
                         if factor == 0:
                             factor = 0.01
                     if self.invert[graph_id]:
-                        data *= h / factor
+                        factor = h / factor
                     else:
-                        data *= -h / factor
-                    data -= self.bias[graph_id]
-
+                        factor = -h / factor
                     if self.fft_show:
-                        data += h - 3
+                        offset = h - 3 - self.bias[graph_id]
                     else:
-                        data += (h / 2.0)
+                        offset = (h / 2.0) - self.bias[graph_id]
+                    data *= factor
+                    data += offset
+                    if low is not None:
+                        low *= factor
+                        low += offset
 
                     # The actual drawing of the graph
-                    lines = (arange(len(data), dtype='float32') *
-                             self.draw_interval) + x_offset
-                    lines = list(zip(lines, data))
+                    xs = arange(len(data), dtype=float64)
+                    xs *= self.draw_interval
+                    xs += x_offset
 
                     if self.fft_show:
-                        n = data.argmin()
-                        if self.tuning_line > 0 and \
-                                n > 0 and n < len(lines) - 1:
-                            # Interpolate
-                            a, b, c = \
-                                lines[n - 1][0], lines[n][0], lines[n + 1][0]
-                            x = b - (a / float(a + b + c)) + (
-                                c / float(a + b + c))
-                            x *= scale
-                            if x > A0 and x < C8:
-                                self.activity.tuning_toolbar.label.set_markup(
-                                    freq_note(x, flatsharp=True))
+                        if self.tuning_line > 0 and not tuning_strings:
+                            self.activity.tuning_toolbar.show_pitch(
+                                self.activity.audiograb.get_pitch(graph_id))
                     else:
                         if self.triggering != self.TRIGGER_NONE:
                             x = int(self.trigger_xpos * w)
@@ -450,15 +757,13 @@ class DrawWaveform(Gtk.DrawingArea):
                                        self._TRIGGER_LINE_THICKNESS)
                             cr.stroke()
 
-                    cr.set_line_width(self._FOREGROUND_LINE_THICKNESS)
-                    c = self.color[graph_id]
-                    cr.set_source_rgb(c.red, c.green, c.blue)
-                    cr.move_to(lines[0][0], lines[0][1])
-                    for xy in lines[1:]:
-                        cr.line_to(xy[0], xy[1])
-                    cr.stroke()
-
-            self._flush_redraw()
+                    if self._renderer is None or \
+                            self._renderer.width != w or \
+                            self._renderer.height != h:
+                        self._renderer = TraceRenderer(w, h)
+                    self._renderer.draw(cr, self.color[graph_id],
+                                        self._FOREGROUND_LINE_THICKNESS,
+                                        xs, data, low)
 
     def set_graph_source(self, graph_id, source=0):
         """Sets from where the graph will get data
@@ -472,12 +777,29 @@ class DrawWaveform(Gtk.DrawingArea):
         self.freq_div = freq_div
 
         self._update_mode()
+        self._flush_redraw()
 
     def get_trigger(self):
         return self.triggering
 
     def set_trigger(self, trigger):
         self.triggering = trigger
+        self._update_mode()
+        self._flush_redraw()
+
+    def get_acquire_mode(self):
+        return self.acquire_mode
+
+    def set_acquire_mode(self, mode):
+        ''' Acquisition.AUTO, NORMAL or SINGLE '''
+        self.acquire_mode = mode
+        self._flush_redraw()
+
+    def arm_trigger(self):
+        ''' Wait for another trigger, and clear the window captured '''
+        self.acquisition.captured = None
+        self.acquisition.arm()
+        self._flush_redraw()
 
     def get_ticks(self):
         return self.get_allocated_width() / float(self._tick_size)
@@ -490,6 +812,60 @@ class DrawWaveform(Gtk.DrawingArea):
         """Sets whether FFT mode is ON (True) or OFF (False)"""
         self.fft_show = fft_mode
         self._update_mode()
+        self._flush_redraw()
+
+    def _new_spectrogram(self, size, rows):
+        """ A spectrogram as tall as the widget, and a mask per channel
+        through which its image is painted """
+        bins = size // 2 + 1
+        stride = cairo.ImageSurface.format_stride_for_width(
+            cairo.FORMAT_A8, bins)
+        self.spectrum = Spectrogram(size, self.channels, rows, stride)
+        self._spectrogram_masks = []
+        for image in self.spectrum.images:
+            surface = cairo.ImageSurface.create_for_data(
+                image, cairo.FORMAT_A8, bins, len(image), stride)
+            pattern = cairo.SurfacePattern(surface)
+            pattern.set_filter(cairo.FILTER_NEAREST)
+            self._spectrogram_masks.append((surface, pattern))
+
+    def _draw_spectrogram(self, cr, graph_id):
+        """ Add the new segments of a channel to the spectrogram, and
+        paint the newest rows, newest at the top, in its colour """
+        spectrogram = self.spectrum
+        surface, pattern = self._spectrogram_masks[graph_id]
+        surface.flush()
+        spectrogram.update(self.ringbuffer, graph_id, self.input_step)
+        surface.mark_dirty()
+
+        # One bin every draw_interval pixels, one row per pixel
+        pattern.set_matrix(cairo.Matrix(
+            xx=1.0 / self.draw_interval, y0=spectrogram.top(graph_id)))
+        c = self.color[graph_id]
+        cr.set_source_rgb(c.red, c.green, c.blue)
+        cr.mask(pattern)
+
+    def get_spectrogram_mode(self):
+        """Returns if the spectrogram replaces the spectrum trace"""
+        return self.spectrogram_show
+
+    def set_spectrogram_mode(self, spectrogram_mode=False):
+        """Sets whether FFT mode shows a scrolling spectrogram (True)
+        or the spectrum trace (False)"""
+        self.spectrogram_show = spectrogram_mode
+        self._update_mode()
+        self._flush_redraw()
+
+    def get_spectrum_average(self):
+        """Returns the time constant of the spectrum average, in seconds"""
+        return self.spectrum_average
+
+    def set_spectrum_average(self, time_constant=SPECTRUM_AVERAGE_TIME):
+        """Sets the time constant, in seconds, with which successive
+        spectra are averaged; 0 shows a single spectrum per frame"""
+        self.spectrum_average = time_constant
+        self._update_mode()
+        self._flush_redraw()
 
     def set_freq_range(self, freq_range=4):
         """See sound_toolbar to see what all frequency ranges are"""
@@ -506,33 +882,70 @@ class DrawWaveform(Gtk.DrawingArea):
 
             self.draw_interval = 5.0
 
-            self.set_max_samples(
-                ceil(self.get_allocated_width() /
-                     float(self.draw_interval) * 2) * self.input_step)
-
-            # Create the (blackman) window
-            self.fft_window = blackman(
-                ceil(self.get_allocated_width() /
-                     float(self.draw_interval) * 2))
+            size = ceil(self.get_allocated_width() /
+                        float(self.draw_interval) * 2)
+            h = self.get_allocated_height()
+            key = (size, self.input_step, self.channels,
+                   self.spectrum_average, self.spectrogram_show, h)
+            if self.spectrum_average > 0 or self.spectrogram_show:
+                # Keep enough samples that no segment is lost between
+                # two frames
+                self.set_max_samples(size * self.input_step + int(
+                    self._input_freq * SPECTRUM_BACKLOG))
+            else:
+                self.set_max_samples(size * self.input_step)
+            if self._spectrum_key != key:
+                if self.spectrogram_show:
+                    self._new_spectrogram(size, h)
+                elif self.spectrum_average > 0:
+                    self.spectrum = AveragedSpectrum(
+                        size, self.channels,
+                        self._input_freq / float(self.input_step),
+                        self.spectrum_average)
+                else:
+                    self.spectrum = SpectrumEngine(size)
+            self._spectrum_key = key
 
             self.draw_interval *= wanted_step / self.input_step
         else:
+            # Start the spectrum afresh when we come back to it
+            self._spectrum_key = None
+
             # Factor is just for triggering:
             time = (self.time_div * self.get_ticks())
             if time == 0:
                 return
             samples = time * self._input_freq
-            self.set_max_samples(samples * self.max_samples_fact)
 
             self.input_step = max(ceil(samples /
                                        (self.get_allocated_width() / 3.0)), 1)
             self.draw_interval = self.get_allocated_width() / \
                 (float(samples) / self.input_step)
 
-            self.fft_window = None
+            # Without a trigger, slow time bases plot the envelope of
+            # each column.  The raw ring buffer only keeps what the
+            # fastest time base without the envelope needs, so that
+            # switching back to one draws at once.
+            if self.input_step >= ENVELOPE_MIN_STEP and \
+                    self.triggering == self.TRIGGER_NONE:
+                columns = int(ceil(samples / self.input_step))
+                if self.envelope is None or \
+                        self.envelope.bucket != self.input_step or \
+                        self.envelope.columns != columns:
+                    self.envelope = EnvelopeBuffer(
+                        self.channels, columns, self.input_step, dtype=int16)
+                self.set_max_samples(
+                    columns * ENVELOPE_MIN_STEP * self.max_samples_fact)
+                return
+            self.set_max_samples(samples * self.max_samples_fact)
+        self.envelope = None
 
     def set_active(self, active):
         self.active = active
+        if active:
+            self._start_frames()
+        else:
+            self._stop_frames()
         self._flush_redraw()
 
     def get_active(self):
@@ -544,15 +957,18 @@ class DrawWaveform(Gtk.DrawingArea):
     def set_mag_params(self, gain=1.0, y_mag=1.0, channel=0):
         self.gain[channel] = gain
         self.y_mag[channel] = y_mag
+        self._flush_redraw()
 
     def get_bias_param(self, channel=0):
         return self.bias[channel]
 
     def set_bias_param(self, bias=0, channel=0):
         self.bias[channel] = bias
+        self._flush_redraw()
 
     def set_visibility(self, state, channel=0):
         self.visibility[channel] = state
+        self._flush_redraw()
 
     def get_visibility(self, channel=0):
         return self.visibility[channel]
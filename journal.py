@@ -26,11 +26,15 @@ import time
 import os
 import io
 import dbus
+from collections import deque
+from threading import Lock
 from gettext import gettext as _
 
 from sugar3.datastore import datastore
 from sugar3.graphics import style
 
+from logstore import ReadingStore
+
 # Initialize logging.
 import logging
 log = logging.getLogger('measure-activity')
@@ -50,11 +54,20 @@ class DataLogger():
         ''' We store csv data in the Journal entry for Measure; screen captures
             are stored in separate Journal entries '''
         self.activity = activity
-        self.data_buffer = []
+        # Lines of csv data, and the ReadingStore of each session, in
+        # the order they are to be written to the Journal
+        self.data_buffer = deque()
+        # The ReadingStore of the session being logged, and its number;
+        # readings come from the analysis worker, while sessions start
+        # and stop on the main loop
+        self._store = None
+        self._session = None
+        self._lock = Lock()
 
     def start_new_session(self, user='', xscale=0, yscale=0,
                           logging_interval='', channels=1, mode='sound'):
         ''' Start a new logging session by updating session parameters '''
+        self.stop_session()
         self.activity.session_id += 1
 
         self.data_buffer.append('%s: %d' % (_('Session'),
@@ -68,19 +81,69 @@ class DataLogger():
         if channels > 1:
             self.data_buffer.append('%s: %d' % (_('Channels'),
                                                 channels))
+
+        path = os.path.join(os.environ['SUGAR_ACTIVITY_ROOT'], 'instance',
+                            'session_%d.log' % (self.activity.session_id))
+        fmt = '%0.3f' if mode == 'voltage' else '%d'
+        store = ReadingStore(path, fmt)
+        self.data_buffer.append(store)
+        with self._lock:
+            self._store = store
+            self._session = self.activity.session_id
         return self.activity.session_id
 
     def write_value(self, value='', channel=None, sample=0):
-        '''Append the value passed to data_buffer '''
-        if channel is None:
-            self.data_buffer.append('%d: %s' % (sample, str(value)))
-        elif self.activity.wave.visibility[channel]:
-            self.data_buffer.append('%d.%d: %s' % (
-                sample, channel, str(value)))
+        '''Append the value passed to the session's readings '''
+        with self._lock:
+            store = self._store
+        if store is None:
+            return
+        # A store closed since drops the reading
+        if channel is None or self.activity.wave.visibility[channel]:
+            store.append(sample, channel, float(value))
+
+    def stop_session(self, session=None):
+        '''Write out the readings of the session; if session is given,
+        only if that is still the one being logged'''
+        with self._lock:
+            store = self._store
+            if store is None or \
+                    (session is not None and session != self._session):
+                return
+            self._store = None
+            self._session = None
+        store.close()
+
+    def has_data(self):
+        ''' Is there anything not yet written to the Journal? '''
+        for item in self.data_buffer:
+            if not isinstance(item, ReadingStore) or \
+                    len(item) > item.exported:
+                return True
+        return False
 
-    def stop_session(self):
-        '''Write the data_buffer onto a file'''
-        return
+    def export(self):
+        ''' Yield the lines of csv data not yet written to the
+        Journal, and forget them; the readings of a session still being
+        logged are kept for the next export. '''
+        while self.data_buffer:
+            item = self.data_buffer[0]
+            if isinstance(item, ReadingStore):
+                yield from item.lines()
+                if not item.closed:
+                    return
+                item.remove()
+            else:
+                yield item
+            self.data_buffer.popleft()
+
+    def clear(self):
+        ''' Forget any data not yet written to the Journal '''
+        self.stop_session()
+        for item in self.data_buffer:
+            if isinstance(item, ReadingStore):
+                item.remove()
+        self.data_buffer.clear()
 
     def take_screenshot(self, capture_count=1):
         ''' Take a screenshot and save to the Journal '''
@@ -117,6 +180,26 @@ class DataLogger():
             return True
         return False
 
+    def save_recording(self, path, recording_count=1):
+        ''' Save a recording of the raw capture to the Journal '''
+        if not os.path.exists(path):
+            return False
+        dsobject = datastore.create()
+        try:
+            dsobject.metadata['title'] = '%s %d' % (_('Recording'),
+                                                    recording_count)
+            dsobject.metadata['keep'] = '0'
+            dsobject.metadata['buddies'] = ''
+            dsobject.metadata['icon-color'] = self.activity.icon_colors
+            dsobject.metadata['mime_type'] = 'audio/x-wav'
+            dsobject.set_file_path(path)
+            datastore.write(dsobject)
+        finally:
+            dsobject.destroy()
+            del dsobject
+        os.remove(path)
+        return True
+
     def _get_preview_data(self, screenshot_surface):
         screenshot_width = screenshot_surface.get_width()
         screenshot_height = screenshot_surface.get_height()
@@ -0,0 +1,145 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import os
+from queue import Queue
+from threading import Lock, Thread
+
+import numpy as np
+
+from config import LOG_CHUNK, LOG_CHUNKS
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+# One logged reading; channel is -1 for a session of one channel
+READING = np.dtype([('sample', '<i8'), ('channel', '<i2'),
+                    ('value', '<f8')])
+
+
+class ReadingStore():
+    ''' The readings of a logging session, in an append-only binary
+    file of READING records.
+
+    Readings are written into a preallocated chunk of LOG_CHUNK
+    records; a full chunk is handed to a writer thread, which appends
+    it to the file, and the next one is taken from a pool of
+    LOG_CHUNKS, so memory use does not grow with the session.  When
+    the writer falls behind by the whole pool, append waits for it.
+
+    The readings not yet exported are read back in chunks, as lines of
+    the Journal's csv format, by lines(). '''
+
+    def __init__(self, path, fmt='%d', chunk=LOG_CHUNK, chunks=LOG_CHUNKS):
+        self.path = path
+        self.fmt = fmt
+        self._file = open(path, 'wb')
+        self._free = Queue()
+        for i in range(max(chunks, 2) - 1):
+            self._free.put(np.empty(chunk, dtype=READING))
+        self._full = Queue()
+        self._chunk = np.empty(chunk, dtype=READING)
+        self._count = 0  # records in self._chunk
+        self._lock = Lock()
+        self.written = 0  # records in the file
+        self.exported = 0  # records returned by lines()
+        self.closed = False
+        self._thread = Thread(target=self._write_chunks, daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return self.written + self._count
+
+    def append(self, sample, channel, value):
+        ''' Add a reading; channel is None for one channel '''
+        with self._lock:
+            if self.closed:
+                return
+            record = self._chunk[self._count]
+            record['sample'] = sample
+            record['channel'] = -1 if channel is None else channel
+            record['value'] = value
+            self._count += 1
+            if self._count == len(self._chunk):
+                self._hand_over()
+
+    def _hand_over(self):
+        self._full.put((self._chunk, self._count))
+        self._chunk = self._free.get()
+        self._count = 0
+
+    def _write_chunks(self):
+        while True:
+            chunk, count = self._full.get()
+            if chunk is None:
+                self._full.task_done()
+                return
+            try:
+                self._file.write(chunk[:count].tobytes())
+                self._file.flush()
+                self.written += count
+            except (IOError, OSError) as e:
+                log.error('could not write %s: %s' % (self.path, e))
+            self._free.put(chunk)
+            self._full.task_done()
+
+    def flush(self):
+        ''' Write out every reading so far, and wait until it is '''
+        with self._lock:
+            if self._count:
+                self._hand_over()
+        self._full.join()
+
+    def close(self):
+        ''' End the session: write out the readings and stop the writer '''
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            if self._count:
+                self._hand_over()
+            self._full.put((None, 0))
+        self._thread.join()
+        self._file.close()
+
+    def lines(self):
+        ''' Yield the readings not yet exported as csv lines, reading
+        the file a chunk at a time '''
+        if not self.closed:
+            self.flush()
+        end = self.written
+        chunk = len(self._chunk)
+        with open(self.path, 'rb') as fd:
+            fd.seek(self.exported * READING.itemsize)
+            while self.exported < end:
+                count = min(chunk, end - self.exported)
+                records = np.fromfile(fd, dtype=READING, count=count)
+                if len(records) < count:
+                    log.error('%s is truncated' % (self.path))
+                    return
+                self.exported += count
+                for sample, channel, value in records.tolist():
+                    value = self.fmt % value
+                    if channel < 0:
+                        yield '%d: %s' % (sample, value)
+                    else:
+                        yield '%d.%d: %s' % (sample, channel, value)
+
+    def remove(self):
+        ''' Close the session and delete its file '''
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
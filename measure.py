@@ -25,6 +25,7 @@ for api, ver in vs.items():
 from gi.repository import Gdk, Gtk, GdkPixbuf, Gst, Gio
 import os
 import csv
+import shutil
 
 from gettext import gettext as _
 
@@ -36,10 +37,12 @@ from sugar3.graphics.icon import Icon
 from sugar3.graphics.toolbarbox import ToolbarBox
 from sugar3.graphics.toolbarbox import ToolbarButton
 from sugar3.graphics.toolbutton import ToolButton
+from sugar3.graphics.objectchooser import ObjectChooser
 from sugar3.graphics import style
 from sugar3.datastore import datastore
 
 from sugar3 import profile
+from sugar3 import mime
 
 from journal import DataLogger
 import audiograb
@@ -142,6 +145,7 @@ class MeasureActivity(activity.Activity):
             return self._incompatible()
 
         self._image_counter = 1
+        self._recording_counter = 1
 
         def mode_image(name):
             path = os.path.join(ICONS_DIR, name)
@@ -290,6 +294,18 @@ class MeasureActivity(activity.Activity):
         self._capture.show()
         toolbox.toolbar.insert(self._capture, -1)
 
+        self._recording = ToolButton('media-record')
+        self._recording.set_tooltip(_('Record waveform'))
+        self._recording.connect('clicked', self._recording_cb)
+        self._recording.show()
+        toolbox.toolbar.insert(self._recording, -1)
+
+        self._play = ToolButton('document-open')
+        self._play.set_tooltip(_('Play a recording'))
+        self._play.connect('clicked', self._play_cb)
+        self._play.show()
+        toolbox.toolbar.insert(self._play, -1)
+
         separator = Gtk.SeparatorToolItem()
         separator.props.draw = False
         separator.set_expand(True)
@@ -393,9 +409,9 @@ class MeasureActivity(activity.Activity):
         # FIXME: Don't use ""s around data
         if hasattr(self, 'data_logger') and \
                 self.new_recording and \
-                len(self.data_logger.data_buffer) > 0:
+                self.data_logger.has_data():
             # Append new data to Journal entry
-            fd = open(file_path, 'ab')
+            fd = open(file_path, 'a', newline='')
             writer = csv.writer(fd)
             # Also output to a separate file as a workaround to Ticket 2127
             # (the assumption being that this file will be opened by the user)
@@ -403,13 +419,12 @@ class MeasureActivity(activity.Activity):
                                          'instance', 'sensor_data' + '.csv')
             log.debug('saving sensor data to %s' % (tmp_data_file))
             if self._dsobject is None:  # first time, so create
-                fd2 = open(tmp_data_file, 'wb')
+                fd2 = open(tmp_data_file, 'w', newline='')
             else:  # we've been here before, so append
-                fd2 = open(tmp_data_file, 'ab')
+                fd2 = open(tmp_data_file, 'a', newline='')
             writer2 = csv.writer(fd2)
-            # Pop data off start of buffer until it is empty
-            for i in range(len(self.data_logger.data_buffer)):
-                datum = self.data_logger.data_buffer.pop(0)
+            # Take the data out of the logger as it is written
+            for datum in self.data_logger.export():
                 writer.writerow([datum])
                 writer2.writerow([datum])
             fd.close()
@@ -442,12 +457,12 @@ class MeasureActivity(activity.Activity):
                     # File has been opened by Write cannot be read by Measure
                     # See Ticket 2127
                     log.error('File was opened by Write: Measure cannot read')
-                    self.data_logger.data_buffer = []
+                    self.data_logger.clear()
                     return
                 self.data_logger.data_buffer.append(row[0])
         if self.session_id == 0:
             # log.debug('setting data_logger buffer to []')
-            self.data_logger.data_buffer = []
+            self.data_logger.clear()
 
     def _pause_play_cb(self, button=None):
         ''' Callback for Pause Button '''
@@ -468,15 +483,70 @@ class MeasureActivity(activity.Activity):
         self.data_logger.take_screenshot(self._image_counter)
         self._image_counter += 1
 
+    def _recording_cb(self, button=None):
+        ''' Callback for Record Waveform Button '''
+        if self.audiograb.is_recording():
+            recorder = self.audiograb.stop_recording()
+            self._recording.set_icon_name('media-record')
+            self._recording.set_tooltip(_('Record waveform'))
+            self.data_logger.save_recording(recorder.path,
+                                            self._recording_counter)
+            self._recording_counter += 1
+        else:
+            path = os.path.join(os.environ['SUGAR_ACTIVITY_ROOT'], 'instance',
+                                'recording_%d.wav' % (self._recording_counter))
+            self.audiograb.start_recording(path)
+            self._recording.set_icon_name('record-stop')
+            self._recording.set_tooltip(_('Stop recording waveform'))
+
+    def _play_cb(self, button=None):
+        ''' Callback for Play Recording Button '''
+        if self.audiograb.get_playback() is not None:
+            self.audiograb.stop_playback()
+            self.playback_stopped()
+            return
+
+        chooser = ObjectChooser(parent=self,
+                                what_filter=mime.GENERIC_TYPE_AUDIO)
+        try:
+            if chooser.run() != Gtk.ResponseType.ACCEPT:
+                return
+            dsobject = chooser.get_selected_object()
+            if dsobject is None:
+                return
+            # The Journal's copy goes when the object does
+            path = os.path.join(os.environ['SUGAR_ACTIVITY_ROOT'], 'instance',
+                                'playback.wav')
+            shutil.copyfile(dsobject.file_path, path)
+            dsobject.destroy()
+        finally:
+            chooser.destroy()
+            del chooser
+
+        try:
+            self.audiograb.start_playback(path)
+        except (ValueError, IOError, OSError) as e:
+            log.error('cannot play %s: %s' % (path, e))
+            return
+        self._play.set_icon_name('media-playback-stop')
+        self._play.set_tooltip(_('Return to live capture'))
+
+    def playback_stopped(self):
+        ''' Back to live capture: the Play button opens a recording '''
+        self._play.set_icon_name('document-open')
+        self._play.set_tooltip(_('Play a recording'))
+
     def timefreq_control(self, button=None):
         ''' Callback for Freq. Button '''
         # Turn off logging when switching modes
         if self.audiograb.we_are_logging:
             self.sensor_toolbar.record_control_cb()
-        if self.wave.get_fft_mode():
-            self.wave.set_fft_mode(False)
-            self.freq.set_icon_name('domain-time')
-            self.freq.set_tooltip(_('Time Base'))
+        if self.wave.get_spectrogram_mode():
+            self.time_base()
+        elif self.wave.get_fft_mode():
+            # Frequency Base, as a scrolling spectrogram
+            self.wave.set_spectrogram_mode(True)
+            self.freq.set_tooltip(_('Spectrogram'))
         else:
             self.wave.set_fft_mode(True)
             self.freq.set_icon_name('domain-freq')
@@ -491,6 +561,14 @@ class MeasureActivity(activity.Activity):
         self.sensor_toolbar.update_string_for_textbox()
         return False
 
+    def time_base(self):
+        ''' Go back to the time base, from the spectrum or the
+        spectrogram '''
+        self.wave.set_spectrogram_mode(False)
+        self.wave.set_fft_mode(False)
+        self.freq.set_icon_name('domain-time')
+        self.freq.set_tooltip(_('Time Base'))
+
     def get_icon_colors_from_sugar(self):
         ''' Returns the icon colors from the Sugar profile '''
         return profile.get_color().to_string()
@@ -0,0 +1,301 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import re
+import subprocess
+import time
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+
+try:
+    import alsaaudio
+except ImportError:
+    alsaaudio = None
+
+from config import MIXER_BACKEND, MIXER_ALSAAUDIO, MIXER_AMIXER
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+VOLUME = 'volume'  # as a percentage
+SWITCH = 'switch'  # True when on (unmuted)
+
+
+class Mixer(metaclass=ABCMeta):
+    ''' The ALSA simple mixer controls of the sound card.
+
+    Every control is read at once, on first use and on refresh(), and
+    the values are kept: get_volume() and get_switch() then cost
+    nothing.  A set_volume() or set_switch() to the value already there
+    does nothing; inside a batch() the changes are held back, and
+    applied together, in one call to the backend, at its end.  Controls
+    the card does not have are left alone, and read as the default.
+    Until the controls could be read, each use tries again, and every
+    change is passed on to the backend as it is.
+
+    reads and writes count the calls to the backend. '''
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self._controls = None
+        self._pending = None
+
+    def refresh(self):
+        ''' Read every control afresh '''
+        self._controls = self._read()
+        self.reads += 1
+
+    @property
+    def controls(self):
+        ''' The values of every control, or None if they could not be
+        read '''
+        if self._controls is None:
+            self.refresh()
+        return self._controls
+
+    def get_volume(self, control, default=100):
+        return (self.controls or {}).get(control, {}).get(VOLUME, default)
+
+    def get_switch(self, control, default=False):
+        return (self.controls or {}).get(control, {}).get(SWITCH, default)
+
+    def set_volume(self, control, percent):
+        self._set(control, VOLUME, int(percent))
+
+    def set_switch(self, control, state):
+        self._set(control, SWITCH, bool(state))
+
+    def _set(self, control, kind, value):
+        controls = self.controls
+        if controls is not None and kind not in controls.get(control, {}):
+            log.debug('mixer has no %s %s' % (control, kind))
+            return
+        if self._pending is not None:
+            self._pending[(control, kind)] = value
+        else:
+            self._apply({(control, kind): value}, controls)
+
+    @contextmanager
+    def batch(self):
+        ''' Hold back the changes made inside, and apply them together '''
+        if self._pending is not None:
+            yield  # within an outer batch
+            return
+        self._pending = {}
+        try:
+            yield
+        finally:
+            pending, self._pending = self._pending, None
+            self._apply(pending, self.controls)
+
+    def _apply(self, pending, controls):
+        # All of them when the controls could not be read
+        known = controls or {}
+        changes = [(control, kind, value)
+                   for (control, kind), value in pending.items()
+                   if known.get(control, {}).get(kind) != value]
+        if not changes:
+            return
+        self.writes += 1
+        if self._write(changes) and controls is not None:
+            for control, kind, value in changes:
+                controls.setdefault(control, {})[kind] = value
+        else:
+            # Some may have been set: read them again when next needed
+            self._controls = None
+
+    @abstractmethod
+    def _read(self):
+        ''' Return {control: {VOLUME: percent, SWITCH: on}} for every
+        control, or None if they could not be read '''
+
+    @abstractmethod
+    def _write(self, changes):
+        ''' Set a list of (control, VOLUME or SWITCH, value); return
+        False if it failed '''
+
+
+_CONTROL = re.compile(r"^Simple mixer control '(.*)',(\d+)$")
+_VOLUME = re.compile(r'\[(\d+)%\]')
+_SWITCH = re.compile(r'\[(on|off)\]')
+
+
+def parse_scontents(output):
+    ''' The controls listed by "amixer scontents", with the volume and
+    switch of their front left, or else mono, channel '''
+    channels = {}
+    for line in output.splitlines():
+        match = _CONTROL.match(line)
+        if match is not None:
+            name, index = match.groups()
+            if index != '0':
+                name = '%s,%s' % (name, index)
+            channels[name] = {}
+        elif channels and ':' in line:
+            label, values = line.strip().split(':', 1)
+            channels[name][label] = values
+
+    controls = {}
+    for name, values in channels.items():
+        line = values.get('Front Left') or values.get('Mono') or ''
+        controls[name] = {}
+        volume = _VOLUME.search(line)
+        if volume is not None:
+            controls[name][VOLUME] = int(volume.group(1))
+        switch = _SWITCH.search(line)
+        if switch is not None:
+            controls[name][SWITCH] = switch.group(1) == 'on'
+    return controls
+
+
+def _run(command, text, warning):
+    try:
+        return subprocess.run(command, input=text, stdout=subprocess.PIPE,
+                              universal_newlines=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        log.warning(warning)
+        return None
+
+
+class AmixerMixer(Mixer):
+    ''' Through the amixer command: "amixer scontents" reads every
+    control, and "amixer -s" sets a batch of them from its input '''
+
+    def _read(self):
+        output = _run(['amixer', 'scontents'], None,
+                      'amixer: Could not read the mixer controls')
+        if output is None:
+            return None
+        return parse_scontents(output)
+
+    def _write(self, changes):
+        commands = []
+        for control, kind, value in changes:
+            if kind == VOLUME:
+                value = '%d%%' % (value)
+            else:
+                value = 'unmute' if value else 'mute'
+            commands.append("sset '%s' %s\n" % (control, value))
+        return _run(['amixer', '-q', '-s'], ''.join(commands),
+                    'Problem with amixer setting %s' %
+                    (', '.join(control for control, kind, value
+                               in changes))) is not None
+
+
+class AlsaMixer(Mixer):
+    ''' Through pyalsaaudio, without running any command.  Switches are
+    set in both directions a control has, as amixer does. '''
+
+    def __init__(self):
+        Mixer.__init__(self)
+        self._mixers = {}
+
+    def _read(self):
+        controls = {}
+        self._mixers = {}
+        try:
+            names = alsaaudio.mixers()
+        except alsaaudio.ALSAAudioError as e:
+            log.warning('alsaaudio: Could not read the mixer controls: %s'
+                        % (e))
+            return None
+        for name in names:
+            try:
+                mixer = alsaaudio.Mixer(name)
+                values = {}
+                volumes = _directions(mixer.volumecap())
+                if volumes:
+                    values[VOLUME] = int(mixer.getvolume(volumes[0])[0])
+                switches = _directions(mixer.switchcap())
+                if alsaaudio.PCM_PLAYBACK in switches:
+                    values[SWITCH] = not mixer.getmute()[0]
+                elif switches:
+                    values[SWITCH] = bool(mixer.getrec()[0])
+            except alsaaudio.ALSAAudioError:
+                continue
+            self._mixers[name] = mixer
+            controls[name] = values
+        return controls
+
+    def _write(self, changes):
+        done = True
+        for control, kind, value in changes:
+            try:
+                mixer = self._mixers.get(control) or alsaaudio.Mixer(control)
+                if kind == VOLUME:
+                    for direction in _directions(mixer.volumecap()):
+                        mixer.setvolume(value, alsaaudio.MIXER_CHANNEL_ALL,
+                                        direction)
+                else:
+                    switches = _directions(mixer.switchcap())
+                    if alsaaudio.PCM_PLAYBACK in switches:
+                        mixer.setmute(0 if value else 1)
+                    if alsaaudio.PCM_CAPTURE in switches:
+                        mixer.setrec(1 if value else 0)
+            except alsaaudio.ALSAAudioError as e:
+                log.warning('alsaaudio: Problem setting %s: %s'
+                            % (control, e))
+                done = False
+        return done
+
+
+def _directions(capabilities):
+    ''' The directions of the volume or switch capabilities of a
+    pyalsaaudio mixer, playback first '''
+    directions = []
+    if [c for c in capabilities if 'Capture' not in c]:
+        directions.append(alsaaudio.PCM_PLAYBACK)
+    if [c for c in capabilities if 'Capture' in c]:
+        directions.append(alsaaudio.PCM_CAPTURE)
+    return directions
+
+
+class FakeMixer(Mixer):
+    ''' Controls kept in memory, for running without a sound card and
+    for timing mode switches: each call to the backend takes latency
+    seconds, as running a command would, and the batches written are
+    kept in history.  Clear readable to have reads fail. '''
+
+    def __init__(self, controls=None, latency=0.0):
+        Mixer.__init__(self)
+        self.latency = latency
+        self.readable = True
+        self.history = []
+        self._values = dict((name, dict(values)) for name, values in
+                            (controls or {}).items())
+
+    def _read(self):
+        time.sleep(self.latency)
+        if not self.readable:
+            return None
+        return dict((name, dict(values))
+                    for name, values in self._values.items())
+
+    def _write(self, changes):
+        time.sleep(self.latency)
+        for control, kind, value in changes:
+            self._values.setdefault(control, {})[kind] = value
+        self.history.append(changes)
+        return True
+
+
+def open_mixer(backend=MIXER_BACKEND):
+    ''' The mixer of the sound card, through pyalsaaudio if it was asked
+    for and is installed, and amixer otherwise '''
+    if backend == MIXER_ALSAAUDIO and alsaaudio is not None:
+        return AlsaMixer()
+    if backend not in (MIXER_ALSAAUDIO, MIXER_AMIXER):
+        log.warning('unknown mixer %s, using amixer' % (backend))
+    return AmixerMixer()
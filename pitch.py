@@ -0,0 +1,359 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from math import ceil, floor
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from spectrum import SpectrumEngine, rfft_into, irfft_into
+from config import RATE, PITCH_DECIMATION, PITCH_FRAME, PITCH_HOP, \
+    PITCH_THRESHOLD, PITCH_MIN, PITCH_MAX, PITCH_SPLIT, PITCH_FINE_FRAME, \
+    PITCH_FINE_TAPS, PITCH_STRING_DECIMATION, PITCH_STRING_FRAME, \
+    PITCH_STRING_HOP, PITCH_HARMONICS, PITCH_STRING_SPAN, PITCH_STRING_SNR
+
+
+def lowpass(taps, cutoff):
+    ''' A Hamming windowed sinc low-pass filter; cutoff is a fraction
+    of the sample rate '''
+    n = np.arange(taps) - (taps - 1) / 2.0
+    h = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return h / h.sum()
+
+
+class Decimator():
+    ''' Low-pass filter and decimate a stream given in pieces of any
+    length, keeping the filter history between pieces.  Only the
+    samples that are kept are filtered. '''
+
+    def __init__(self, factor, taps=None):
+        self.factor = int(factor)
+        if taps is None:
+            taps = 32 * self.factor + 1
+        # Pass most of the new band, stop well before its Nyquist
+        self._filter = lowpass(taps, 0.45 / self.factor)[::-1].copy()
+        self._history = np.zeros(taps - 1, dtype=np.float64)
+
+    def process(self, samples):
+        ''' Return the decimated samples of the next piece of stream '''
+        taps = len(self._filter)
+        data = np.concatenate((self._history, samples))
+        count = (len(data) - taps) // self.factor + 1
+        if count <= 0:
+            self._history = data[-(taps - 1):]
+            return data[:0]
+        windows = as_strided(
+            data, shape=(count, taps),
+            strides=(data.strides[0] * self.factor, data.strides[0]))
+        out = windows.dot(self._filter)
+        self._history = data[count * self.factor:]
+        return out
+
+
+class FrameAnalyser():
+    ''' Base of the analysers of a stream that look at its last frame
+    of samples, decimated, every hop samples; subclasses implement
+    _update(signal). '''
+
+    def __init__(self, rate, decimation, frame, hop):
+        self.rate = float(rate) / decimation
+        self.frame = int(frame)
+        self.hop = int(hop)
+        self._decimator = Decimator(decimation)
+        self._signal = np.zeros(self.frame, dtype=np.float64)
+        self._since = 0
+        self.analyses = 0
+
+    def feed(self, samples):
+        ''' Add samples (at the full rate) to the stream; analyses every
+        hop that is completed '''
+        data = self._decimator.process(samples)
+        signal = self._signal
+        while len(data):
+            count = min(self.hop - self._since, len(data))
+            signal[:-count] = signal[count:]
+            signal[-count:] = data[:count]
+            data = data[count:]
+            self._since += count
+            if self._since == self.hop:
+                self._since = 0
+                self._update(signal)
+                self.analyses += 1
+
+
+class Yin():
+    ''' The YIN method on frames of a fixed length: the period, in
+    samples, among lag_min to lag_max.
+
+    The difference function is computed from an autocorrelation done
+    with FFTs, the first dip of its cumulative mean normalised form
+    below threshold is taken, else the deepest one, and the period is
+    refined with parabolic interpolation. '''
+
+    # Frames whose deepest dip is no lower than this have no period
+    UNVOICED = 0.25
+
+    def __init__(self, frame, lag_min, lag_max, threshold):
+        self.frame = int(frame)
+        self.threshold = threshold
+        self.lag_min = max(int(lag_min), 2)
+        self.lag_max = min(int(lag_max), self.frame // 2)
+        self._lags = np.arange(self.lag_max + 2)
+
+        nfft = 2 * self.frame
+        self._padded = np.zeros(nfft, dtype=np.float64)
+        self._spectrum = np.empty(nfft // 2 + 1, dtype=np.complex128)
+        self._power = np.empty(nfft // 2 + 1, dtype=np.float64)
+        self._correlation = np.empty(nfft, dtype=np.float64)
+        self._energy = np.empty(self.frame + 1, dtype=np.float64)
+
+    def analyse(self, signal):
+        ''' Return the period, in samples (0.0 when there is none), the
+        clarity of a frame, and whether its dip was below threshold '''
+        frame = self.frame
+        lags = self._lags
+
+        # Autocorrelation of the frame, without wrap-around
+        self._padded[:frame] = signal
+        rfft_into(self._padded, self._spectrum)
+        np.absolute(self._spectrum, out=self._power)
+        np.multiply(self._power, self._power, out=self._power)
+        correlation = irfft_into(self._power, len(self._padded),
+                                 self._correlation)
+
+        # Energies of the overlapping parts of the frame at each lag:
+        # d(lag) = sum(x[j] - x[j + lag]) ** 2, over j < frame - lag
+        energy = self._energy
+        energy[0] = 0.0
+        np.cumsum(signal * signal, out=energy[1:])
+        total = energy[-1]
+        if total <= 0.0:
+            return 0.0, 0.0, False
+        head = energy[frame - lags]
+        tail = total - energy[lags]
+        difference = head + tail - 2.0 * correlation[lags]
+
+        # Cumulative mean normalised difference
+        normalised = np.ones(len(lags), dtype=np.float64)
+        running = np.cumsum(difference[1:])
+        running[running <= 0.0] = np.finfo(np.float64).tiny
+        normalised[1:] = difference[1:] * lags[1:] / running
+
+        # The first dip below the threshold, else the deepest one.  A
+        # period may be only a few samples, so the depth of each dip is
+        # taken from a parabola through it, not the samples.
+        lag_min, lag_max = self.lag_min, self.lag_max
+        a = normalised[lag_min - 1:lag_max - 1]
+        b = normalised[lag_min:lag_max]
+        c = normalised[lag_min + 1:lag_max + 1]
+        dips = np.flatnonzero((b < a) & (b <= c))
+        if len(dips) == 0:
+            return 0.0, 0.0, False
+        a, b, c = a[dips], b[dips], c[dips]
+        depth = b - (a - c) ** 2 / (8.0 * (a - 2.0 * b + c))
+        below = np.flatnonzero(depth < self.threshold)
+        dip = below[0] if len(below) else depth.argmin()
+        clarity = min(max(1.0 - depth[dip], 0.0), 1.0)
+        if depth[dip] >= self.UNVOICED:
+            return 0.0, clarity, False
+
+        # The period, from a parabola through the raw difference
+        lag = lag_min + dips[dip]
+        a, b, c = difference[lag - 1], difference[lag], difference[lag + 1]
+        curvature = a - 2.0 * b + c
+        if curvature > 0:
+            period = lag + 0.5 * (a - c) / curvature
+        else:
+            period = float(lag)
+        return period, clarity, len(below) > 0
+
+
+class PitchDetector(FrameAnalyser):
+    ''' The fundamental frequency of a stream, with the YIN method.
+
+    The stream is decimated by PITCH_DECIMATION and analysed every
+    PITCH_HOP decimated samples, over the last PITCH_FRAME of them, so
+    the cost and the latency depend on the sample rate only, not on the
+    display.  Above PITCH_SPLIT a period is too few decimated samples
+    long to be told from its multiples, so the periods of high pitches
+    are looked for at the full rate instead, in the last
+    PITCH_FINE_FRAME samples, whenever the decimated frame gives no
+    period or one short enough to be a multiple of theirs.  These are
+    low-passed just above PITCH_MAX first: the noise of the whole band
+    would otherwise hide the period, and the decimated frame, which is
+    filtered, would report a subharmonic instead.
+
+    After each analysis, frequency holds the pitch in Hz (0.0 when the
+    frame has none), and clarity how periodic the frame is, from 0 to
+    1.  Both may be read from any thread. '''
+
+    def __init__(self, rate=RATE, decimation=PITCH_DECIMATION,
+                 frame=PITCH_FRAME, hop=PITCH_HOP,
+                 threshold=PITCH_THRESHOLD, minimum=PITCH_MIN,
+                 maximum=PITCH_MAX, split=PITCH_SPLIT,
+                 fine=PITCH_FINE_FRAME, taps=PITCH_FINE_TAPS):
+        FrameAnalyser.__init__(self, rate, decimation, frame, hop)
+        self.full_rate = float(rate)
+
+        # Periods searched, in decimated and in full rate samples
+        self._coarse = Yin(self.frame, floor(self.rate / split) - 1,
+                           ceil(self.rate / minimum) + 1, threshold)
+        self._fine = Yin(fine, floor(self.full_rate / maximum) - 1,
+                         ceil(self.full_rate / split) + 1, threshold)
+        self._smooth = lowpass(taps, 1.15 * maximum / self.full_rate)
+        self._smoothed = np.empty(self._fine.frame, dtype=np.float64)
+        self._recent = np.zeros(self._fine.frame + taps - 1,
+                                dtype=np.float64)
+
+        self.frequency = 0.0
+        self.clarity = 0.0
+
+    def feed(self, samples):
+        recent = self._recent
+        count = min(len(samples), len(recent))
+        if count:
+            recent[:-count] = recent[count:]
+            recent[-count:] = samples[-count:]
+        FrameAnalyser.feed(self, samples)
+
+    def _update(self, signal):
+        self.frequency, self.clarity = self.analyse(signal, self._recent)
+
+    def analyse(self, signal, recent=None):
+        ''' Return the pitch, in Hz, and the clarity of a frame of
+        decimated samples and, if given, of the last full rate samples
+        (as many as the fine frame and the taps of its filter, less one)
+        '''
+        period, clarity, found = self._coarse.analyse(signal)
+        # The period found may be a multiple of one too short to see
+        if recent is not None and \
+                period < 2 * self._coarse.lag_min + 2:
+            # The filter is symmetric, so this is its convolution
+            windows = as_strided(
+                recent, shape=(len(self._smoothed), len(self._smooth)),
+                strides=(recent.strides[0], recent.strides[0]))
+            windows.dot(self._smooth, out=self._smoothed)
+            fine, fine_clarity, found = self._fine.analyse(self._smoothed)
+            if found:
+                return self.full_rate / fine, fine_clarity
+        if period == 0.0:
+            return 0.0, clarity
+        return self.rate / period, clarity
+
+
+class StringDetector(FrameAnalyser):
+    ''' The tuning of every string of an instrument at once, from one
+    magnitude spectrum per hop.
+
+    The stream is decimated by PITCH_STRING_DECIMATION, and a spectrum
+    of the last PITCH_STRING_FRAME samples is taken every
+    PITCH_STRING_HOP.  For each string and each of its first
+    harmonics, the bins within PITCH_STRING_SPAN cents of it are
+    gathered through an index table built once per instrument.  The
+    peak of each is refined with a parabola through the log magnitudes,
+    which fits the main lobe of the window well, and the offsets of the
+    harmonics of a string are averaged, weighted by their magnitudes.
+
+    After each hop, cents holds the offset of each string (nan when it
+    is not sounding) and levels its strength; both may be read from
+    any thread. '''
+
+    def __init__(self, targets, rate=RATE,
+                 decimation=PITCH_STRING_DECIMATION,
+                 frame=PITCH_STRING_FRAME, hop=PITCH_STRING_HOP,
+                 harmonics=PITCH_HARMONICS, span=PITCH_STRING_SPAN):
+        FrameAnalyser.__init__(self, rate, decimation, frame, hop)
+        self.targets = np.asarray(targets, dtype=np.float64)
+        self.engine = SpectrumEngine(self.frame)
+        self.bin_width = self.rate / self.frame
+        bins = self.frame // 2 + 1
+        orders = np.arange(1, harmonics + 1, dtype=np.float64)
+
+        # Centre and half width, in bins, of each harmonic of each
+        # string; all windows are padded to the widest one
+        centres = self.targets[:, None] * orders[None, :] / self.bin_width
+        ratio = pow(2.0, span / 1200.0)
+        halves = np.maximum(np.ceil(centres * (ratio - 1)), 1).astype(int)
+        half = int(halves.max())
+        offsets = np.arange(-half, half + 1)
+        first = np.rint(centres).astype(int)
+        self._index = np.clip(first[:, :, None] + offsets, 1, bins - 2)
+        self._outside = np.abs(offsets) > halves[:, :, None]
+        # Leave a bin on each side for the interpolation
+        self._valid = (first - halves >= 1) & (first + halves <= bins - 2)
+
+        # Skip harmonics that another string shares (the third of A2 is
+        # E4, for one), unless a string has nothing else to go by
+        flat = centres.ravel()
+        near = np.abs(flat[:, None] - flat[None, :]) <= \
+            halves.ravel()[:, None]
+        owner = np.repeat(np.arange(len(self.targets)), harmonics)
+        near &= owner[:, None] != owner[None, :]
+        shared = near.any(axis=1).reshape(centres.shape)
+        shared[shared.all(axis=1)] = False
+        self._valid &= ~shared
+        self._needed = np.clip(self._valid.sum(axis=1), 1, 2)
+
+        self._halves = halves
+        self._orders = orders
+        self._half = half
+
+        self.cents = np.full(len(self.targets), np.nan)
+        self.levels = np.zeros(len(self.targets))
+
+    def _update(self, signal):
+        self.cents, self.levels = self.detect(self.engine.transform(signal))
+
+    def detect(self, magnitude, floor=None):
+        ''' Return the cents offset of each string (nan where a string
+        is not sounding) and the level of each, from a magnitude
+        spectrum of frame samples.  A string is sounding when its
+        fundamental or a harmonic peaks above floor, by default
+        PITCH_STRING_SNR times the median magnitude. '''
+        if floor is None:
+            floor = PITCH_STRING_SNR * np.median(magnitude)
+        index = self._index
+        runs = magnitude[index]
+        runs[self._outside] = -1.0
+        peak = runs.argmax(axis=2)
+        bins = np.take_along_axis(index, peak[:, :, None], 2)[:, :, 0]
+
+        tiny = np.finfo(np.float64).tiny
+        b = magnitude[bins]
+        a = np.log(np.maximum(magnitude[bins - 1], tiny))
+        c = np.log(np.maximum(magnitude[bins + 1], tiny))
+        middle = np.log(np.maximum(b, tiny))
+        curvature = a - 2.0 * middle + c
+        shift = np.zeros_like(b)
+        np.divide(0.5 * (a - c), curvature, out=shift, where=curvature < 0)
+        frequency = (bins + shift) * self.bin_width / self._orders
+        # A peak that fell off the edge of its run can interpolate to
+        # 0 Hz or below: it has no cents, and is given no weight below
+        ratio = frequency / self.targets[:, None]
+        positive = ratio > 0
+        cents = np.zeros_like(ratio)
+        np.log2(ratio, out=cents, where=positive)
+        cents *= 1200.0
+
+        # Peaks at the edge of their window belong to something else,
+        inside = np.abs(peak - self._half) < self._halves
+        weight = np.where(self._valid & inside & positive & (b > floor),
+                          b, 0.0)
+        # and a string sounds when two of its harmonics do, so that
+        # a stray partial of another string is not taken for it
+        levels = weight.sum(axis=1)
+        sounding = (weight > 0).sum(axis=1) >= self._needed
+        result = np.full(len(self.targets), np.nan)
+        result[sounding] = (cents * weight).sum(axis=1)[sounding] / \
+            levels[sounding]
+        levels[~sounding] = 0.0
+        return result, levels
@@ -0,0 +1,160 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import struct
+import time
+
+import numpy as np
+
+from gi.repository import GLib
+
+from config import PLAYBACK_BUFFER, PLAYBACK_INTERVAL
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+def wav_layout(path):
+    ''' Return the channels, rate, offset of the samples in the file
+    and number of frames of a 16 bit PCM WAV file '''
+    with open(path, 'rb') as fd:
+        riff, size, wave = struct.unpack('<4sI4s', fd.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError('%s is not a WAV file' % (path))
+        channels = rate = None
+        while True:
+            header = fd.read(8)
+            if len(header) < 8:
+                raise ValueError('%s has no data' % (path))
+            name, size = struct.unpack('<4sI', header)
+            if name == b'fmt ':
+                fmt, channels, rate, rate_bytes, align, bits = \
+                    struct.unpack('<HHIIHH', fd.read(16))
+                if fmt != 1 or bits != 16:
+                    raise ValueError('%s is not 16 bit PCM' % (path))
+                fd.seek(size - 16 + size % 2, 1)
+            elif name == b'data':
+                if channels is None:
+                    raise ValueError('%s has no format' % (path))
+                offset = fd.tell()
+                fd.seek(0, 2)
+                # A recording cut short may not have its size set
+                size = min(size, fd.tell() - offset)
+                return channels, rate, offset, size // (2 * channels)
+            else:
+                fd.seek(size + size % 2, 1)
+
+
+class WavePlayback():
+    ''' A recorded capture as a source of buffers, as if it were live.
+
+    The samples of the file are memory mapped, not read, so a file of
+    any length opens at once, and seeking costs nothing.  start()
+    feeds callback(frames, offset) from the main loop, at the rate of
+    the recording times speed; frames are interleaved int16 frames of
+    every channel, as from the interleaved capture pipeline, and offset
+    is the frame number of the first of them, and calls finished(),
+    if given, once the end of the recording has been played.  Without
+    a main loop, feed() hands over the next frames directly, as fast as
+    the caller wants them. '''
+
+    def __init__(self, path, callback, speed=1.0, buffer=PLAYBACK_BUFFER,
+                 finished=None):
+        self.path = path
+        self.callback = callback
+        self.finished = finished
+        self.channels, self.rate, offset, self.frames = wav_layout(path)
+        if self.frames == 0:
+            raise ValueError('%s is empty' % (path))
+        self.samples = np.memmap(path, dtype='<i2', mode='r', offset=offset,
+                                 shape=(self.frames, self.channels))
+        self.buffer = int(buffer)
+        self.speed = speed
+        self.position = 0
+        self._timer = None
+        self._clock = None  # (time, position) when playing started
+
+    def seek(self, seconds):
+        ''' Go to a time in the recording '''
+        self.position = min(max(int(seconds * self.rate), 0), self.frames)
+        self._restart_clock()
+
+    def tell(self):
+        ''' The time in the recording, in seconds '''
+        return float(self.position) / self.rate
+
+    def set_speed(self, speed):
+        ''' Play at speed times real time '''
+        self.speed = speed
+        self._restart_clock()
+
+    def _restart_clock(self):
+        if self._clock is not None:
+            self._clock = (time.monotonic(), self.position)
+
+    def feed(self, count=None):
+        ''' Hand the next count frames (by default a buffer) to the
+        callback, in buffers; returns the number of frames fed '''
+        if count is None:
+            count = self.buffer
+        end = min(self.position + count, self.frames)
+        start = self.position
+        while self.position < end:
+            stop = min(self.position + self.buffer, end)
+            frames = self.samples[self.position:stop]
+            offset = self.position
+            self.position = stop
+            self.callback(frames, offset)
+        return end - start
+
+    def at_end(self):
+        return self.position >= self.frames
+
+    def start(self):
+        ''' Play from the main loop, in real time times speed '''
+        if self._timer is None:
+            self._clock = (time.monotonic(), self.position)
+            self._timer = GLib.timeout_add(PLAYBACK_INTERVAL, self._tick)
+
+    def stop(self):
+        ''' Stop playing; the position is kept '''
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
+        self._clock = None
+
+    def is_playing(self):
+        return self._timer is not None
+
+    def _tick(self):
+        started, position = self._clock
+        rate = self.rate * self.speed
+        due = position + int((time.monotonic() - started) * rate)
+        # After a stall, carry on from here rather than catch up at once
+        limit = max(self.buffer, int(rate * PLAYBACK_INTERVAL / 250.0))
+        if due - self.position > limit:
+            self.feed(limit)
+            self._restart_clock()
+        elif due > self.position:
+            self.feed(due - self.position)
+        if self.at_end():
+            self._timer = None
+            self._clock = None
+            if self.finished is not None:
+                self.finished()
+            return False
+        return True
+
+    def close(self):
+        self.stop()
+        self.samples = None
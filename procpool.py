@@ -0,0 +1,258 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from threading import Thread
+
+import numpy as np
+
+from pitch import PitchDetector, StringDetector
+from config import RATE, ANALYSIS_RING, ANALYSIS_START_METHOD
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+class SharedRing():
+    ''' A ring buffer of int16 samples in shared memory, with one
+    writer and one reader, in different processes.
+
+    The first 16 bytes hold two counts of samples: claimed, which the
+    writer raises before it copies samples in, and written, which it
+    raises after.  The reader checks claimed before and after copying
+    samples out, as RingBuffer2d does, so that it never returns samples
+    the writer was wrapping over in the meantime. '''
+
+    def __init__(self, length, name=None):
+        self.length = int(length)
+        size = 16 + 2 * self.length
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = _attach(name)
+        self.name = self.memory.name
+        self._counts = np.ndarray((2,), dtype=np.int64,
+                                  buffer=self.memory.buf)
+        self._data = np.ndarray((self.length,), dtype=np.int16,
+                                buffer=self.memory.buf, offset=16)
+        if name is None:
+            self._counts[:] = 0
+
+    @property
+    def claimed(self):
+        return int(self._counts[0])
+
+    @property
+    def written(self):
+        return int(self._counts[1])
+
+    def append(self, samples):
+        ''' Write samples, overwriting the oldest ones '''
+        start = self.written
+        end = start + len(samples)
+        self._counts[0] = end
+        samples = samples[-self.length:]
+        start = end - len(samples)
+        offset = start % self.length
+        head = min(len(samples), self.length - offset)
+        self._data[offset:offset + head] = samples[:head]
+        self._data[:len(samples) - head] = samples[head:]
+        self._counts[1] = end
+
+    def read(self, start, stop):
+        ''' Copy out the samples from start to stop; None if the writer
+        has claimed any of them for newer ones '''
+        if stop - start > self.length or start < 0 or \
+                stop > self.written or self.claimed - start > self.length:
+            return None
+        offset = start % self.length
+        head = min(stop - start, self.length - offset)
+        out = np.empty(stop - start, dtype=np.int16)
+        out[:head] = self._data[offset:offset + head]
+        out[head:] = self._data[:stop - start - head]
+        if self.claimed - start > self.length:
+            return None
+        return out
+
+    def close(self, unlink=False):
+        self._counts = self._data = None
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
+
+
+def _attach(name):
+    ''' Open shared memory made by another process, without leaving its
+    removal to this one '''
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks it, but with the resource tracker
+        # of the parent, which already has it and forgets it on unlink
+        return shared_memory.SharedMemory(name=name)
+
+
+def _channel_main(name, length, rate, ready, conn):
+    ''' The DSP chain of one channel, in a process of its own: the
+    samples come through a SharedRing, and the parent sets ready after
+    each buffer.  The targets of the strings to tune, when they change,
+    and None to finish, come through conn, and the results go back
+    through it as small tuples after each analysis. '''
+    ring = SharedRing(length, name)
+    pitch = PitchDetector(rate)
+    strings = None
+    cursor = 0
+    done = (0, 0)
+    try:
+        while True:
+            ready.wait(0.1)
+            ready.clear()
+            while conn.poll():
+                message = conn.recv()
+                if message is None:
+                    return
+                strings = StringDetector(message, rate) \
+                    if message else None
+
+            written = ring.written
+            skipped = 0
+            if written - cursor > length:
+                skipped = written - length - cursor
+                cursor = written - length
+            samples = ring.read(cursor, written)
+            if samples is None:
+                # Wrapped over while we copied
+                skipped += written - cursor
+                samples = np.zeros(0, dtype=np.int16)
+            cursor = written
+
+            pitch.feed(samples)
+            if strings is not None:
+                strings.feed(samples)
+            now = (pitch.analyses, 0 if strings is None else strings.analyses)
+            if now != done or skipped:
+                done = now
+                conn.send((pitch.frequency, pitch.clarity,
+                           None if strings is None else strings.cents,
+                           None if strings is None else strings.levels,
+                           skipped))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        ring.close()
+
+
+class ChannelProcess():
+    ''' A PitchDetector (and, given targets, a StringDetector) of one
+    channel, run in a worker process.  feed() only copies the samples
+    into shared memory and sets an event, so it never waits; frequency,
+    clarity, cents and levels are those of the last results back, and
+    skipped counts the samples the worker fell too far behind to see. '''
+
+    def __init__(self, context, rate=RATE, length=None):
+        if length is None:
+            length = int(ANALYSIS_RING * rate)
+        self.ring = SharedRing(length)
+        self.connection, child = context.Pipe()
+        self._ready = context.Event()
+        self.process = context.Process(
+            target=_channel_main, name='measure-channel',
+            args=(self.ring.name, length, rate, self._ready, child),
+            daemon=True)
+        self.process.start()
+        child.close()
+        self.targets = None
+        self.frequency = 0.0
+        self.clarity = 0.0
+        self.cents = None
+        self.levels = None
+        self.skipped = 0
+        self.results = 0
+
+    def feed(self, samples):
+        self.ring.append(samples)
+        self._ready.set()
+
+    def set_targets(self, targets):
+        ''' Tune the strings of an instrument, or none '''
+        targets = tuple(targets) if targets else ()
+        if targets != (self.targets or ()):
+            self.targets = targets or None
+            self.cents = self.levels = None
+            self.connection.send(targets)
+
+    def _receive(self):
+        self.frequency, self.clarity, cents, levels, skipped = \
+            self.connection.recv()
+        if self.targets is not None:
+            self.cents, self.levels = cents, levels
+        self.skipped += skipped
+        self.results += 1
+
+    def stop(self):
+        ''' Ask the worker to finish, and wait for it '''
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def close(self):
+        self.connection.close()
+        self.ring.close(unlink=True)
+
+
+class ProcessBackend():
+    ''' One ChannelProcess per channel, so that the pitch and string
+    tracking of the channels, most of the work done per channel, runs
+    on as many cores; a thread takes in the results of all of them.
+
+    The rest of the chain stays where it was.  The spectrum is taken
+    by the display, from its own ring buffer, with the size, step and
+    averaging of the view; the logging statistics are taken on the
+    analysis worker, of the windows the LoggingScheduler picks by
+    frame offset, which the shared memory does not carry.  Both cost
+    little beside pitch tracking. '''
+
+    def __init__(self, channels, rate=RATE, method=ANALYSIS_START_METHOD):
+        context = multiprocessing.get_context(method)
+        self.channels = [ChannelProcess(context, rate)
+                         for channel in range(channels)]
+        self._running = True
+        self._thread = Thread(target=self._receive, daemon=True,
+                              name='measure-results')
+        self._thread.start()
+
+    def _receive(self):
+        owners = dict((channel.connection, channel)
+                      for channel in self.channels)
+        while self._running and owners:
+            for connection in wait(list(owners), timeout=0.5):
+                try:
+                    owners[connection]._receive()
+                except (EOFError, OSError):
+                    if self._running:
+                        log.error('a channel process has gone')
+                    del owners[connection]
+
+    def close(self):
+        self._running = False
+        for channel in self.channels:
+            channel.stop()
+        self._thread.join()
+        for channel in self.channels:
+            channel.close()
@@ -0,0 +1,122 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import wave
+from queue import Queue, Full
+from threading import Thread
+
+import numpy as np
+
+from config import RECORD_QUEUE
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+class WaveRecorder():
+    ''' Record the raw capture, all channels, to a 16 bit WAV file.
+
+    write() only copies the samples and queues them, without ever
+    waiting: a writer thread takes them off a queue of RECORD_QUEUE
+    buffers and appends them to the file.  When the queue is full the
+    buffer is dropped, so that the capture thread is never held up by
+    the disk; the frames lost are counted in dropped, and written as
+    silence, so that the file keeps the timing of the capture.
+
+    Buffers are given either as frames of every channel, or one
+    channel at a time as the deinterleaved pipeline delivers them; the
+    writer interleaves the channels, and writes as many frames as every
+    channel has. '''
+
+    def __init__(self, path, rate, channels, size=RECORD_QUEUE):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.frames = 0  # frames written to the file
+        self.dropped = 0  # frames lost to a full queue
+        self._wave = wave.open(path, 'wb')
+        self._wave.setnchannels(channels)
+        self._wave.setsampwidth(2)
+        self._wave.setframerate(rate)
+        self._queue = Queue(size)
+        self._pending = [[] for channel in range(channels)]
+        self._lost = [0] * (channels + 1)  # the last is for all channels
+        self._closed = False
+        self._thread = Thread(target=self._write_buffers, daemon=True)
+        self._thread.start()
+
+    def write(self, samples, channel=None):
+        ''' Queue a buffer: frames of all channels, or the samples of one
+        channel.  Returns False if it had to be dropped. '''
+        if self._closed:
+            return False
+        key = -1 if channel is None else channel
+        try:
+            self._queue.put_nowait((channel, np.array(samples, dtype='<i2'),
+                                    self._lost[key]))
+        except Full:
+            self._lost[key] += len(samples)
+            if key <= 0:
+                self.dropped += len(samples)
+            return False
+        self._lost[key] = 0
+        return True
+
+    def _write_buffers(self):
+        while True:
+            channel, samples, lost = self._queue.get()
+            if samples is None:
+                return
+            if lost:
+                samples = np.concatenate(
+                    (np.zeros((lost,) + samples.shape[1:], dtype='<i2'),
+                     samples))
+            try:
+                if channel is None:
+                    self._write_frames(samples)
+                else:
+                    self._add_channel(samples, channel)
+            except (IOError, OSError) as e:
+                log.error('could not write %s: %s' % (self.path, e))
+
+    def _add_channel(self, samples, channel):
+        self._pending[channel].append(samples)
+        counts = [sum(len(piece) for piece in pieces)
+                  for pieces in self._pending]
+        count = min(counts)
+        if count == 0:
+            return
+        frames = np.empty((count, self.channels), dtype='<i2')
+        for i, pieces in enumerate(self._pending):
+            data = np.concatenate(pieces)
+            frames[:, i] = data[:count]
+            self._pending[i] = [data[count:]] if len(data) > count else []
+        self._write_frames(frames)
+
+    def _write_frames(self, frames):
+        self._wave.writeframesraw(frames.tobytes())
+        self.frames += len(frames) if frames.ndim > 1 else \
+            len(frames) // self.channels
+
+    def close(self):
+        ''' Write out what is queued and finish the file; returns the
+        number of frames recorded '''
+        if self._closed:
+            return self.frames
+        self._closed = True
+        self._queue.put((None, None, 0))
+        self._thread.join()
+        self._wave.close()
+        if self.dropped:
+            log.warning('recording: %d frames dropped' % (self.dropped))
+        return self.frames
@@ -104,3 +104,325 @@ class RingBuffer1d(object):
                  (len(self._data) - self.offset): step]))
 
         return self._data[self.offset: self.offset + number: step].copy()
+
+
+def _reduce_runs(ufunc, runs, out):
+    """Reduce each row of runs into out with a binary ufunc.  Short rows
+    are folded column by column, which numpy does much faster than a
+    reduction along a short axis."""
+    if runs.shape[1] > 16:
+        ufunc.reduce(runs, axis=1, out=out)
+        return
+    out[:] = runs[:, 0]
+    for column in range(1, runs.shape[1]):
+        ufunc(out, runs[:, column], out=out)
+
+
+class RingBuffer2d(object):
+    """This class implements a ring buffer of several channels, stored as
+    a channels x frames array.  Each channel has a monotonic write cursor
+    counting every frame ever appended to it, so that a reader can tell
+    what is new since its last read and whether the frames it wants have
+    already been overwritten.
+
+    One thread may append while another one reads: the writer claims the
+    frames it is about to overwrite before copying and publishes the
+    cursor afterwards, and the reader checks after its copy that nothing
+    it copied was claimed in the meantime.  Frames that are overwritten
+    before anybody read them are counted in overruns.
+    """
+
+    def __init__(self, channels, length, dtype=None):
+        """Initialize the ring buffer with the given number of channels
+        and frames.  The initial values are all 0s
+        """
+        self.channels = channels
+        self.length = int(length)
+
+        self._data = np.zeros((channels, self.length), dtype=dtype)
+
+        self._written = [0] * channels
+        self._claimed = [0] * channels
+        self._consumed = [0] * channels
+
+        self.overruns = 0
+        self.torn_reads = 0
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def written(self, channel=0):
+        """Return the number of frames ever appended to a channel"""
+        return self._written[channel]
+
+    def stored(self, channel=0):
+        """Return the number of frames of a channel that can be read"""
+        return min(self._written[channel], self.length)
+
+    def append(self, data, channel=None):
+        """Append to the ring buffer (and overwrite old data).  With
+        channel=None, data holds interleaved frames, one column per
+        channel; otherwise data is the samples of that channel alone.
+        If there is more data than the ring holds, the newest data takes
+        precedence.
+        """
+        data = np.asarray(data)
+
+        if channel is None:
+            self._write(slice(None), data.T, 0, range(self.channels))
+        else:
+            self._write(slice(channel, channel + 1), data[np.newaxis],
+                        channel, (channel,))
+
+    def _write(self, rows, data, first, channels):
+        count = data.shape[1]
+        if self.length == 0 or count == 0:
+            return
+
+        start = self._written[first]
+        end = start + count
+
+        lost = end - self._consumed[first] - self.length
+        if lost > 0:
+            self.overruns += min(lost, count)
+            for channel in channels:
+                self._consumed[channel] = end - self.length
+
+        for channel in channels:
+            self._claimed[channel] = end
+
+        if count > self.length:
+            data = data[:, -self.length:]
+            start = end - self.length
+            count = self.length
+
+        offset = start % self.length
+        head = min(count, self.length - offset)
+        self._data[rows, offset:offset + head] = data[:, :head]
+        if head < count:
+            self._data[rows, :count - head] = data[:, head:]
+
+        for channel in channels:
+            self._written[channel] = end
+
+    def read_into(self, out, channel=0, end=None, step=1):
+        """Fill out with every step-th frame of a channel, oldest first,
+        the last of them step frames before the write cursor end (or
+        before the newest frame when end is None), without allocating.
+        Returns the cursor the frames end at, or None when they are not
+        (or no longer) in the ring buffer.
+        """
+        return self._read_checked(self._copy, (out,), len(out), channel,
+                                  end, int(step))
+
+    def read_minmax_into(self, out_min, out_max, channel=0, end=None,
+                         step=1):
+        """Like read_into, but decimate by taking the minimum and the
+        maximum of each run of step frames, so that spikes between the
+        stride points are kept.
+        """
+        return self._read_checked(self._copy_minmax, (out_min, out_max),
+                                  len(out_min), channel, end, int(step))
+
+    def views(self, number=None, step=1, channel=0, end=None):
+        """Return the frames read_into would copy as two views into the
+        ring buffer, (head, tail), oldest first.  The views are only
+        valid until the writer wraps over them.
+        """
+        step = int(step)
+        if number is None:
+            number = self.length // step
+        stop = self._written[channel] if end is None else end
+        start = stop - number * step
+        if start < 0 or stop > self._written[channel] or \
+                self._claimed[channel] - start > self.length:
+            return None
+        return self._views(channel, start, number, step)
+
+    def _read_checked(self, copy, outs, count, channel, end, step):
+        if count * step > self.length:
+            return None
+
+        for attempt in range(3):
+            stop = self._written[channel] if end is None else end
+            start = stop - count * step
+            if start < 0 or stop > self._written[channel]:
+                return None
+            if self._claimed[channel] - start > self.length:
+                if end is None:
+                    continue  # the writer is wrapping over us, try again
+                return None
+
+            copy(outs, channel, start, count, step)
+
+            if self._claimed[channel] - start <= self.length:
+                self._consumed[channel] = max(self._consumed[channel], stop)
+                return stop
+            self.torn_reads += 1
+            if end is not None:
+                return None
+        return None
+
+    def _views(self, channel, start, count, step):
+        row = self._data[channel]
+        offset = start % self.length
+        head = row[offset:offset + count * step:step]
+        skip = offset + len(head) * step - self.length
+        if len(head) == count or skip < 0:
+            return head, row[:0]
+        return head, row[skip:skip + (count - len(head)) * step:step]
+
+    def _copy(self, outs, channel, start, count, step):
+        out, = outs
+        head, tail = self._views(channel, start, count, step)
+        out[:len(head)] = head
+        out[len(head):] = tail
+
+    def _copy_minmax(self, outs, channel, start, count, step):
+        out_min, out_max = outs
+        if count == 0:
+            return
+        row = self._data[channel]
+        offset = start % self.length
+        first = row[offset:offset + count * step]
+        second = row[:count * step - len(first)]
+
+        # Runs that lie wholly before and after the wrap are reduced in
+        # place through reshaped views; a run across it is done apart.
+        before = len(first) // step
+        runs = first[:before * step].reshape(before, step)
+        _reduce_runs(np.minimum, runs, out_min[:before])
+        _reduce_runs(np.maximum, runs, out_max[:before])
+        done = before
+        split = len(first) - before * step
+        if split:
+            rest = step - split
+            out_min[done] = min(first[before * step:].min(),
+                                second[:rest].min())
+            out_max[done] = max(first[before * step:].max(),
+                                second[:rest].max())
+            second = second[rest:]
+            done += 1
+        runs = second.reshape(count - done, step)
+        _reduce_runs(np.minimum, runs, out_min[done:])
+        _reduce_runs(np.maximum, runs, out_max[done:])
+
+    def read(self, number=None, step=1, channel=0):
+        """Read a channel of the ring buffer as RingBuffer1d.read does.
+        Positive numbers count from the oldest data, negative numbers
+        from the newest.  Only the (decimated) result is allocated.
+
+        Before the buffer is filled once: This returns an empty array
+        """
+        step = int(step)
+        if self._written[channel] < self.length or self.length == 0:
+            return np.array([])
+
+        if number is None:
+            number = self.length // step
+
+        assert abs(number * step) <= self.length, \
+            'Number to read*step must be smaller then length'
+
+        out = np.empty(abs(number), dtype=self._data.dtype)
+        if number < 0:
+            end = None
+        else:
+            # Count from the oldest frame still in the ring buffer
+            end = self._written[channel] - self.length + number * step
+        if self.read_into(out, channel, end, step) is None:
+            return np.array([])
+        return out
+
+    def resized(self, length):
+        """Return a new ring buffer of the given length holding as much of
+        the newest data of this one as fits
+        """
+        new_buffer = RingBuffer2d(self.channels, length,
+                                  dtype=self._data.dtype)
+        for channel in range(self.channels):
+            count = min(self.stored(channel), new_buffer.length)
+            if count == 0:
+                continue
+            data = np.empty(count, dtype=self._data.dtype)
+            if self.read_into(data, channel) is not None:
+                new_buffer.append(data, channel=channel)
+        return new_buffer
+
+
+class EnvelopeBuffer(object):
+    """This class keeps the minimum and maximum of every run of bucket
+    samples of a stream, for the newest columns runs of each channel.
+    It is updated incrementally as buffers arrive, so reading it costs
+    O(columns) however many samples a column stands for, and no raw
+    samples need to be kept for the whole window.
+    """
+
+    def __init__(self, channels, columns, bucket, dtype=None):
+        """Initialize the envelope with the given number of channels,
+        columns, and samples per column
+        """
+        self.channels = channels
+        self.columns = int(columns)
+        self.bucket = max(int(bucket), 1)
+
+        # One ring buffer per channel: row 0 is the minimum, row 1 the
+        # maximum, appended together so that they share one cursor
+        self._rings = [RingBuffer2d(2, self.columns, dtype=dtype)
+                       for channel in range(channels)]
+        self._partial = [np.empty(0, dtype=dtype)
+                         for channel in range(channels)]
+
+    def append(self, data, channel=None):
+        """Add samples to the envelope; with channel=None, data holds
+        interleaved frames, one column per channel
+        """
+        data = np.asarray(data)
+        if channel is None:
+            for channel in range(self.channels):
+                self._append(data[:, channel], channel)
+        else:
+            self._append(data, channel)
+
+    def _append(self, data, channel):
+        ring = self._rings[channel]
+        partial = self._partial[channel]
+        need = self.bucket - len(partial)
+
+        if len(data) < need:
+            self._partial[channel] = np.concatenate((partial, data))
+            return
+
+        count = 1 + (len(data) - need) // self.bucket
+        pairs = np.empty((count, 2), dtype=ring.dtype)
+
+        # The first column completes the samples left from last time
+        pairs[0, 0] = data[:need].min()
+        pairs[0, 1] = data[:need].max()
+        if len(partial):
+            pairs[0, 0] = min(pairs[0, 0], partial.min())
+            pairs[0, 1] = max(pairs[0, 1], partial.max())
+
+        end = need + (count - 1) * self.bucket
+        runs = data[need:end].reshape(count - 1, self.bucket)
+        _reduce_runs(np.minimum, runs, pairs[1:, 0])
+        _reduce_runs(np.maximum, runs, pairs[1:, 1])
+
+        ring.append(pairs)
+        self._partial[channel] = data[end:].copy()
+
+    def read(self, channel=0, number=None):
+        """Return (minimum, maximum) arrays of the newest number columns
+        of a channel, oldest first, or None until that many columns have
+        been filled
+        """
+        if number is None:
+            number = self.columns
+        ring = self._rings[channel]
+        low = np.empty(number, dtype=ring.dtype)
+        high = np.empty(number, dtype=ring.dtype)
+        end = ring.read_into(low, 0)
+        if end is None or ring.read_into(high, 1, end) is None:
+            return None
+        return low, high
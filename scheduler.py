@@ -0,0 +1,116 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import numpy as np
+
+from config import LOG_WINDOW
+
+import logging
+log = logging.getLogger('measure-activity')
+log.setLevel(logging.DEBUG)
+
+
+class LoggingScheduler():
+    ''' Decide which samples of the captured stream become log readings.
+
+    Time is counted in frames of the stream itself, not by a clock:
+    reading k of a channel is taken from the window of LOG_WINDOW
+    seconds that starts interval * k seconds after the first frame of
+    the session, as soon as the buffer that completes the window has
+    arrived.  An interval of 0 takes a single reading per channel.
+
+    Buffers carry their frame offset in the stream where the source
+    sets it; a jump forward in offsets (frames the pipeline dropped) is
+    logged and recorded in gaps as (channel, frame, missing frames).
+    Readings due inside a gap are still taken, from what is left of
+    their window, so that no reading is lost. '''
+
+    def __init__(self, rate, interval, channels, limit=None,
+                 window=LOG_WINDOW):
+        self.rate = rate
+        self.interval = max(int(round(interval * rate)), 0)
+        self.window = max(int(round(window * rate)), 1)
+        self.limit = limit
+        self.gaps = []
+        self._start = [None] * channels
+        self._position = [0] * channels
+        self._taken = [0] * channels
+        self._history = [np.zeros(0, dtype=np.int16)] * channels
+
+    def taken(self, channel=0):
+        ''' The number of readings taken of a channel '''
+        return self._taken[channel]
+
+    @property
+    def finished(self):
+        ''' True when every channel has taken its last reading '''
+        last = 1 if self.interval == 0 else self.limit
+        if last is None:
+            return False
+        return min(self._taken) >= last
+
+    def process(self, samples, channel=0, offset=None):
+        ''' Account for the next buffer of a channel, given with its
+        offset in the stream in frames, if known; returns the readings
+        it completes as a list of (index, window of samples) '''
+        count = len(samples)
+        position = self._position[channel]
+        history = self._history[channel]
+        if offset is not None and self._start[channel] is not None:
+            if offset > position:
+                log.warning('logging: %d frames missing from channel %d '
+                            'at frame %d' % (offset - position, channel,
+                                             position))
+                self.gaps.append((channel, position, offset - position))
+                history = history[:0]
+            elif offset < position:
+                log.warning('logging: channel %d restarted at frame %d'
+                            % (channel, offset))
+                self.gaps.append((channel, position, 0))
+                self._start[channel] += offset - position
+            position = offset
+        elif offset is not None:
+            position = offset
+        if self._start[channel] is None:
+            self._start[channel] = position
+        self._position[channel] = position + count
+
+        readings = []
+        if self.finished:
+            return readings
+        first = position - len(history)  # frame of history[0]
+        data = None
+        while True:
+            index = self._taken[channel]
+            if index > 0 and self.interval == 0 or \
+                    self.limit is not None and index >= self.limit:
+                break
+            begin = self._start[channel] + index * self.interval
+            end = begin + self.window
+            if end > position + count:
+                break
+            if data is None:
+                data = np.concatenate((history, samples))
+            # A window lost in a gap is taken from the frames after it
+            start = max(begin - first, 0)
+            stop = max(end - first, min(start + self.window, len(data)))
+            readings.append((index, data[start:stop]))
+            self._taken[channel] = index + 1
+
+        # Keep the frames a later window may still need
+        if count >= self.window:
+            self._history[channel] = np.array(samples[-self.window:])
+        else:
+            if data is None:
+                data = np.concatenate((history, samples))
+            self._history[channel] = data[-self.window:]
+        return readings
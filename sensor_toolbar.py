@@ -25,6 +25,9 @@ from config import CAPTURE_GAIN, MIC_BOOST, XO1, XO15, XO175, XO4
 from sugar3.graphics.toolbutton import ToolButton
 from sugar3.graphics.menuitem import MenuItem
 from sugar3.graphics.radiotoolbutton import RadioToolButton
+
+from trigger import Acquisition
+
 import logging
 log = logging.getLogger('measure-activity')
 log.setLevel(logging.DEBUG)
@@ -34,6 +37,10 @@ LOG_TIMER_LABELS = {1: _('1/10 second'), 10: _('1 second'),
                     300: _('30 seconds'), 3000: _('5 minutes'),
                     30000: _('30 minutes')}
 
+ACQUIRE_LABELS = {Acquisition.AUTO: _('Auto'),
+                  Acquisition.NORMAL: _('Normal'),
+                  Acquisition.SINGLE: _('Single')}
+
 
 def _can_use_dc(hw):
     ''' Return True if this is DC sensor capable hardware '''
@@ -169,6 +176,25 @@ of XO)") + ' '
                                   self.update_trigger_control_cb,
                                   self.activity.wave.TRIGGER_NEG)
 
+        # Set up Acquisition Mode Button: its palette picks the mode,
+        # a click waits for another trigger
+        self.acquire_label = Gtk.Label(ACQUIRE_LABELS[Acquisition.AUTO])
+        toolitem = Gtk.ToolItem()
+        toolitem.add(self.acquire_label)
+        self.insert(toolitem, -1)
+
+        self._acquire_button = ToolButton('view-refresh')
+        self._acquire_button.set_tooltip(_('Wait for a trigger'))
+        self._acquire_button.connect('clicked', self._acquire_arm_cb)
+        self.insert(self._acquire_button, -1)
+        palette = self._acquire_button.get_palette()
+        for mode in (Acquisition.AUTO, Acquisition.NORMAL,
+                     Acquisition.SINGLE):
+            menu_item = MenuItem(text_label=ACQUIRE_LABELS[mode])
+            menu_item.connect('activate', self._acquire_selected_cb, mode)
+            palette.menu.append(menu_item)
+            menu_item.show()
+
         self.show_all()
 
     def get_log(self):
@@ -258,6 +284,13 @@ of XO)") + ' '
         except RuntimeError as e:
             logging.debug('Warning: Maximum Recursions on the same method has taken place', e)
 
+    def _acquire_selected_cb(self, button, mode):
+        self.acquire_label.set_text(ACQUIRE_LABELS[mode])
+        self.activity.wave.set_acquire_mode(mode)
+
+    def _acquire_arm_cb(self, button=None):
+        self.activity.wave.arm_trigger()
+
     def analog_resistance_voltage_mode_cb(self, button=None,
                                           mode_to_set='sound'):
         ''' Callback for Analog/Resistance/Voltage Buttons '''
@@ -276,7 +309,7 @@ of XO)") + ' '
 
         # Force time domain when switching modes
         if self.activity.wave.get_fft_mode():
-            self.activity.timefreq_control()
+            self.activity.time_base()
         # Turn off logging when switching modes
         if self.activity.audiograb.we_are_logging:
             self.record_control_cb()
@@ -418,6 +451,7 @@ of XO)") + ' '
         session, or just logs the current buffer. '''
         if self.activity.audiograb.we_are_logging:
             self.activity.audiograb.set_logging_params(start_stop=False)
+            self.activity.data_logger.stop_session()
             self._record.set_icon_name('media-record')
             self._record.show()
             self._record.set_tooltip(_('Start Recording'))
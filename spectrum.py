@@ -0,0 +1,240 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from math import exp
+
+import numpy as np
+
+from config import SPECTRUM_OVERLAP, SPECTROGRAM_RANGE
+
+
+WINDOWS = {
+    'blackman': np.blackman,
+    'hamming': np.hamming,
+    'hanning': np.hanning,
+    'bartlett': np.bartlett,
+    'rectangular': np.ones}
+
+_window_cache = {}
+
+
+def get_window(length, window='blackman'):
+    ''' Return a (shared, read-only) window of a type and length '''
+    key = (length, window)
+    if key not in _window_cache:
+        values = WINDOWS[window](length).astype(np.float64)
+        values.flags.writeable = False
+        _window_cache[key] = values
+    return _window_cache[key]
+
+
+def rfft_into(frame, out):
+    ''' numpy.fft.rfft, writing to out where numpy allows it '''
+    try:
+        return np.fft.rfft(frame, out=out)
+    except TypeError:  # numpy < 2.0 has no out argument
+        out[:] = np.fft.rfft(frame)
+        return out
+
+
+def irfft_into(spectrum, n, out):
+    ''' numpy.fft.irfft, writing to out where numpy allows it '''
+    try:
+        return np.fft.irfft(spectrum, n, out=out)
+    except TypeError:
+        out[:] = np.fft.irfft(spectrum, n)
+        return out
+
+
+class SpectrumEngine():
+    ''' Magnitude spectrum of the newest samples of a channel.
+
+    All buffers are allocated once per transform size: a frame is
+    read straight from the ring buffer into a float64 buffer, windowed
+    in place and transformed into a preallocated complex buffer.
+    numpy's FFT keeps the plans it has computed, so reusing one size
+    reuses one plan.
+
+    The magnitude is divided by the sum of the window, which makes a
+    full scale sine read the same whatever the window and size. '''
+
+    def __init__(self, size, window='blackman'):
+        self.size = int(size)
+        self.window_type = window
+        self.window = get_window(self.size, window)
+        self._gain = 1.0 / self.window.sum()
+        self._frame = np.empty(self.size, dtype=np.float64)
+        self._spectrum = np.empty(self.size // 2 + 1, dtype=np.complex128)
+        self.magnitude = np.empty(self.size // 2 + 1, dtype=np.float64)
+
+    def transform(self, samples):
+        ''' Return the magnitude spectrum of size samples.  The array
+        returned is reused by the next call. '''
+        np.multiply(samples, self.window, out=self._frame)
+        return self._magnitude()
+
+    def transform_ring(self, ringbuffer, channel=0, step=1):
+        ''' Like transform, for the newest size samples (taking every
+        step-th) of a channel of a RingBuffer2d.  Returns None while
+        the ring buffer does not hold that many. '''
+        if ringbuffer.read_into(self._frame, channel, step=step) is None:
+            return None
+        np.multiply(self._frame, self.window, out=self._frame)
+        return self._magnitude()
+
+    def _magnitude(self):
+        rfft_into(self._frame, self._spectrum)
+        np.absolute(self._spectrum, out=self.magnitude)
+        np.multiply(self.magnitude, self._gain, out=self.magnitude)
+        return self.magnitude
+
+
+class SegmentedSpectrum(SpectrumEngine):
+    ''' Base of the spectra of a stream that transform every segment
+    once, when it has arrived, however often they are read.
+
+    Each channel keeps a cursor to the end of its next segment in the
+    ring buffer; consecutive segments overlap by the given fraction.
+    Segments the ring buffer lost before they were read are counted in
+    skipped. '''
+
+    def __init__(self, size, channels, overlap=SPECTRUM_OVERLAP,
+                 window='blackman'):
+        SpectrumEngine.__init__(self, size, window)
+        self.channels = channels
+        self.hop = max(int(self.size * (1.0 - overlap)), 1)
+        self._cursor = [None] * channels
+        self.segments = 0
+        self.skipped = 0
+
+    def _new_segments(self, ringbuffer, channel, step):
+        ''' Yield the magnitude spectrum of each segment of a channel
+        that arrived since the last call, in order '''
+        step = int(step)
+        span = self.size * step
+        hop = self.hop * step
+        written = ringbuffer.written(channel)
+        cursor = self._cursor[channel]
+        if cursor is None or cursor > written + hop or \
+                cursor - span < written - ringbuffer.length:
+            # First call, a resized ring buffer or one that overran us
+            if cursor is not None and cursor <= written + hop:
+                self.skipped += (written - cursor) // hop + 1
+            cursor = max(written, span)
+
+        while cursor <= written:
+            if ringbuffer.read_into(self._frame, channel, cursor,
+                                    step) is None:
+                # Overwritten while we read it: skip to the newest data
+                self.skipped += 1
+                cursor = ringbuffer.written(channel) + hop
+                break
+            np.multiply(self._frame, self.window, out=self._frame)
+            self.segments += 1
+            cursor += hop
+            self._cursor[channel] = cursor
+            yield self._magnitude()
+        self._cursor[channel] = cursor
+
+
+class AveragedSpectrum(SegmentedSpectrum):
+    ''' Welch's method with an exponential average: the power spectra
+    of overlapping segments are averaged with a time constant, in
+    seconds of the (decimated) sample rate. '''
+
+    def __init__(self, size, channels, rate, time_constant,
+                 overlap=SPECTRUM_OVERLAP, window='blackman'):
+        SegmentedSpectrum.__init__(self, size, channels, overlap, window)
+        self.rate = rate
+        self.set_time_constant(time_constant)
+        self._power = np.zeros((channels, self.size // 2 + 1),
+                               dtype=np.float64)
+        self._primed = [False] * channels
+
+    def set_time_constant(self, time_constant):
+        self.time_constant = time_constant
+        if time_constant > 0:
+            self._alpha = 1.0 - exp(-self.hop / (time_constant * self.rate))
+        else:
+            self._alpha = 1.0
+
+    def transform_ring(self, ringbuffer, channel=0, step=1):
+        ''' Fold the segments of a channel that arrived since the last
+        call into its average, and return the averaged magnitude
+        spectrum (None until there is a first segment).  The array
+        returned is reused by the next call. '''
+        power = self._power[channel]
+        for scratch in self._new_segments(ringbuffer, channel, step):
+            np.multiply(scratch, scratch, out=scratch)
+            if self._primed[channel]:
+                # power += alpha * (scratch - power)
+                np.subtract(scratch, power, out=scratch)
+                np.multiply(scratch, self._alpha, out=scratch)
+                np.add(power, scratch, out=power)
+            else:
+                power[:] = scratch
+                self._primed[channel] = True
+
+        if not self._primed[channel]:
+            return None
+        return np.sqrt(power, out=self.magnitude)
+
+
+class Spectrogram(SegmentedSpectrum):
+    ''' A waterfall: the magnitude spectrum of every segment, in dB,
+    as a row of a uint8 image per channel that holds the newest rows.
+
+    Each image is 2 * rows tall and every row is written twice, rows
+    apart, so that the newest rows, newest first, are always the
+    contiguous rows top(channel) to top(channel) + rows: showing them
+    is a single blit, and adding a segment costs one FFT and two row
+    writes however long the history is.  Rows are stride bytes wide,
+    to suit image surfaces that need padded rows. '''
+
+    def __init__(self, size, channels, rows, stride=None,
+                 dynamic_range=SPECTROGRAM_RANGE, overlap=SPECTRUM_OVERLAP,
+                 window='blackman'):
+        SegmentedSpectrum.__init__(self, size, channels, overlap, window)
+        self.rows = int(rows)
+        self.bins = self.size // 2 + 1
+        if stride is None:
+            stride = self.bins
+        self.images = [np.zeros((2 * self.rows, stride), dtype=np.uint8)
+                       for channel in range(channels)]
+        self._top = [0] * channels
+        # 255 at a full scale sine, 0 at dynamic_range dB below it
+        self._scale = 255.0 / dynamic_range * 20.0
+        self._offset = 255.0 - self._scale * np.log10(16384.0)
+
+    def top(self, channel=0):
+        ''' The image row of the newest segment of a channel '''
+        return self._top[channel]
+
+    def update(self, ringbuffer, channel=0, step=1):
+        ''' Add the segments of a channel that arrived since the last
+        call; returns how many there were '''
+        image = self.images[channel]
+        top = self._top[channel]
+        count = 0
+        for scratch in self._new_segments(ringbuffer, channel, step):
+            np.maximum(scratch, 1e-3, out=scratch)
+            np.log10(scratch, out=scratch)
+            np.multiply(scratch, self._scale, out=scratch)
+            np.add(scratch, self._offset, out=scratch)
+            np.clip(scratch, 0, 255, out=scratch)
+            top = (top - 1) % self.rows
+            row = image[top, :self.bins]
+            np.copyto(row, scratch, casting='unsafe')
+            image[top + self.rows, :self.bins] = row
+            count += 1
+        self._top[channel] = top
+        return count
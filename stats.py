@@ -0,0 +1,47 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from collections import namedtuple
+
+import numpy as np
+
+
+Stats = namedtuple('Stats', ['mean', 'mean_abs', 'rms', 'minimum',
+                             'maximum', 'peak_to_peak'])
+
+EMPTY_STATS = Stats(0.0, 0.0, 0.0, 0, 0, 0)
+
+
+def sample_stats(data):
+    ''' Calc. the mean, mean magnitude, RMS, minimum, maximum and
+    peak-to-peak value of an array of samples.
+
+    The samples are widened to float64 once, and every statistic is
+    taken from that copy with a vectorised reduction, so the cost per
+    sample is a handful of machine instructions rather than a trip
+    through the interpreter. '''
+    data = np.asarray(data)
+    count = len(data)
+    if count == 0:
+        return EMPTY_STATS
+
+    wide = data.astype(np.float64)
+    total = wide.sum()
+    power = wide.dot(wide)
+    minimum = int(data.min())
+    maximum = int(data.max())
+    np.absolute(wide, out=wide)
+    magnitude = wide.sum()
+
+    return Stats(float(total / count), float(magnitude / count),
+                 float(np.sqrt(power / count)), minimum, maximum,
+                 maximum - minimum)
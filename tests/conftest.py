@@ -0,0 +1,18 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import os
+import sys
+
+# The activity's modules sit at the top of the bundle
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
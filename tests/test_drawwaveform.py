@@ -0,0 +1,71 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import numpy as np
+import pytest
+
+from config import RATE, ENVELOPE_MIN_STEP
+from ringbuffer import RingBuffer2d
+
+WIDTH = 1200
+
+
+@pytest.fixture
+def wave():
+    ''' A DrawWaveform with just what _update_mode uses, in the time
+    base, and a second of samples in its ring buffer '''
+    drawwaveform = pytest.importorskip('drawwaveform')
+    wave = drawwaveform.DrawWaveform.__new__(drawwaveform.DrawWaveform)
+    wave.get_allocated_width = lambda: WIDTH
+    wave._tick_size = 50
+    wave._input_freq = RATE
+    wave.channels = 1
+    wave.fft_show = False
+    wave.triggering = wave.TRIGGER_NONE
+    wave.envelope = None
+    wave.max_samples_fact = 3
+    wave.max_samples = RATE
+    wave.ringbuffer = RingBuffer2d(1, RATE, dtype=np.int16)
+    wave.ringbuffer.append(np.arange(RATE, dtype=np.int16), channel=0)
+    return wave
+
+
+def _set_time_div(wave, time_div):
+    wave.time_div = time_div
+    wave._update_mode()
+
+
+def test_slider_time_bases_plot_raw_samples(wave):
+    # The slowest time base of the slider, a millisecond per division
+    _set_time_div(wave, 0.001)
+    assert wave.input_step < ENVELOPE_MIN_STEP
+    assert wave.envelope is None
+    assert wave.max_samples == pytest.approx(0.001 * WIDTH / 50 * RATE * 3)
+
+
+def test_slow_time_base_keeps_a_ring_to_switch_back_to(wave):
+    _set_time_div(wave, 0.1)
+    assert wave.input_step >= ENVELOPE_MIN_STEP
+    assert wave.envelope is not None
+    assert wave.max_samples > 0
+
+    # Back to the slider, the raw samples are there to draw at once
+    _set_time_div(wave, 0.001)
+    assert wave.envelope is None
+    assert len(wave.ringbuffer.read(None, wave.input_step)) > 0
+
+
+def test_a_trigger_needs_the_raw_samples(wave):
+    wave.triggering = wave.TRIGGER_POS
+    _set_time_div(wave, 0.1)
+    assert wave.envelope is None
+    assert wave.max_samples == pytest.approx(0.1 * WIDTH / 50 * RATE * 3)
@@ -0,0 +1,87 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from types import SimpleNamespace
+
+import pytest
+
+from config import XO4
+from mixer import FakeMixer, VOLUME, SWITCH
+
+# The controls of an XO-4 that AudioGrab uses
+CONTROLS = {'Master': {VOLUME: 80},
+            'Capture': {VOLUME: 40},
+            'V_REFOUT Enable': {SWITCH: True},
+            'DC Mode Enable': {SWITCH: False},
+            'Mic Boost (+20dB)': {SWITCH: True}}
+
+# SENSOR_DC_NO_BIAS: DC mode, no bias, no gain, no boost
+DC_NO_BIAS = [('Capture', VOLUME, 0),
+              ('DC Mode Enable', SWITCH, True),
+              ('Mic Boost (+20dB)', SWITCH, False),
+              ('V_REFOUT Enable', SWITCH, False)]
+
+
+@pytest.fixture
+def grab():
+    ''' An AudioGrab with just the mixer, and no pipeline to start '''
+    audiograb = pytest.importorskip('audiograb')
+    grab = audiograb.AudioGrab.__new__(audiograb.AudioGrab)
+    grab.activity = SimpleNamespace(hw=XO4)
+    grab.interleaved = True
+    grab.fakesink = []
+    grab.start_sound_device = grab.stop_sound_device = lambda: None
+    grab.mixer = FakeMixer(CONTROLS, latency=0.001)
+    return grab
+
+
+def test_sensor_switch_reads_once_and_writes_once(grab):
+    mixer = grab.mixer
+    grab._set_sensor_type(True, False, 0, False)
+    # The first use, and save_state() afterwards
+    assert mixer.reads == 2
+    assert mixer.writes == 1
+    assert sorted(mixer.history[0]) == DC_NO_BIAS
+    assert (grab.dc_mode, grab.bias, grab.capture_gain, grab.mic_boost) == \
+        (True, False, 0, False)
+    assert grab.master == 80
+
+
+def test_restore_state_writes_only_what_others_changed(grab):
+    mixer = grab.mixer
+    grab._set_sensor_type(True, False, 0, False)
+    reads, writes = mixer.reads, mixer.writes
+    # Changed by another activity while in the background
+    mixer._values['Capture'][VOLUME] = 90
+    mixer._values['DC Mode Enable'][SWITCH] = False
+
+    grab.restore_state()
+    assert mixer.reads - reads == 1
+    # Master and bias are as they were; DC mode is set on its own, and
+    # gain and boost together
+    assert mixer.writes - writes == 2
+    assert mixer.history[-2:] == [[('DC Mode Enable', SWITCH, True)],
+                                  [('Capture', VOLUME, 0)]]
+    assert mixer._read()['Capture'][VOLUME] == 0
+
+
+def test_unreadable_controls_are_still_set(grab):
+    mixer = grab.mixer
+    mixer.readable = False
+    grab._set_sensor_type(True, False, 0, False)
+    # Every change goes to the card, in one batch, unchecked
+    assert mixer.writes == 1
+    assert sorted(mixer.history[0]) == DC_NO_BIAS
+    mixer.readable = True
+    controls = mixer._read()
+    assert [(control, kind, controls[control][kind])
+            for control, kind, value in DC_NO_BIAS] == DC_NO_BIAS
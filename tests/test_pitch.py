@@ -0,0 +1,69 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import numpy as np
+
+from pitch import PitchDetector, StringDetector
+from config import RATE
+
+BASS = [41.2034, 55, 73.4162, 97.9989]
+
+
+def _peak(magnitude, centre, height=1000.0):
+    ''' A peak symmetric about a bin, so that it refines to the bin '''
+    magnitude[centre] = height
+    magnitude[centre - 1] = magnitude[centre + 1] = height / 2
+
+
+def test_peak_below_zero_hz_does_not_poison_a_sounding_string():
+    strings = StringDetector(BASS)
+    magnitude = np.ones(strings.frame // 2 + 1)
+    centres = BASS[0] * strings._orders / strings.bin_width
+    _peak(magnitude, int(round(centres[0])))
+    _peak(magnitude, int(round(centres[1])))
+
+    # The third harmonic peaks on the first bin of its window, on a
+    # slope so nearly straight in log magnitude that the parabola puts
+    # it hundreds of bins down: far below 0 Hz
+    first = strings._index[0, 2][~strings._outside[0, 2]][0]
+    magnitude[first - 1] = 500.0 * np.e
+    magnitude[first] = 500.0
+    magnitude[first + 1] = 500.0 / np.e * 0.999
+    shift = 0.5 * (1 - np.log(0.999) + 1) / np.log(0.999)
+    assert first + shift < 0
+
+    cents, levels = strings.detect(magnitude, floor=8.0)
+    assert levels[0] > 0
+    assert np.isfinite(cents[0])
+    assert abs(cents[0]) < 50
+
+
+def test_strings_follow_a_bass_note():
+    strings = StringDetector(BASS, RATE)
+    t = np.arange(RATE) / float(RATE)
+    tone = sum(np.sin(2 * np.pi * BASS[1] * order * t) / order
+               for order in range(1, 4))
+    strings.feed((8000 * tone).astype(np.int16))
+    assert strings.levels[1] > 0
+    assert abs(strings.cents[1]) < 5
+
+
+def test_high_note_in_noise_is_not_read_as_a_subharmonic():
+    t = np.arange(RATE // 2) / float(RATE)
+    tone = np.sin(2 * np.pi * 2093 * t) + \
+        0.8 * np.sin(2 * np.pi * 4186 * t + 2)
+    tone /= abs(tone).max()
+    # White noise 10 dB below the tone, over the whole band
+    tone += np.random.RandomState(2).standard_normal(len(t)) * 0.22
+    detector = PitchDetector(RATE)
+    detector.feed((10000 * tone).astype(np.int16))
+    assert abs(1200 * np.log2(detector.frequency / 2093)) < 20
@@ -0,0 +1,118 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip('gi.repository.GLib')
+
+import playback  # noqa: E402
+from playback import WavePlayback  # noqa: E402
+
+RATE = 8000
+BUFFER = 256
+
+
+@pytest.fixture
+def recording(tmp_path):
+    ''' One second of stereo, each sample telling its frame and channel '''
+    frames = np.empty((RATE, 2), dtype=np.int16)
+    frames[:, 0] = np.arange(RATE)
+    frames[:, 1] = -frames[:, 0]
+    path = str(tmp_path / 'recording.wav')
+    fd = wave.open(path, 'wb')
+    fd.setnchannels(2)
+    fd.setsampwidth(2)
+    fd.setframerate(RATE)
+    fd.writeframes(frames.tobytes())
+    fd.close()
+    return path, frames
+
+
+class Sink():
+    ''' Stands for AudioGrab.new_buffer: keeps what it is handed '''
+
+    def __init__(self):
+        self.buffers = []
+        self.finished = 0
+
+    def __call__(self, frames, offset):
+        self.buffers.append((np.array(frames), offset))
+
+    def done(self):
+        self.finished += 1
+
+    def check(self, frames):
+        ''' Every buffer holds the frames of the recording at its offset
+        and follows the one before it; returns the frames handed '''
+        for (data, offset), (after, next_offset) in zip(
+                self.buffers, self.buffers[1:]):
+            assert next_offset == offset + len(data)
+        for data, offset in self.buffers:
+            assert len(data) <= BUFFER
+            assert (data == frames[offset:offset + len(data)]).all()
+        return sum(len(data) for data, offset in self.buffers)
+
+
+def test_feed_plays_the_whole_recording_in_buffers(recording):
+    path, frames = recording
+    sink = Sink()
+    player = WavePlayback(path, sink, buffer=BUFFER, finished=sink.done)
+    assert (player.channels, player.rate, player.frames) == (2, RATE, RATE)
+    while not player.at_end():
+        player.feed()
+    assert sink.buffers[0][1] == 0
+    assert sink.check(frames) == RATE
+    assert player.feed() == 0
+    player.close()
+
+
+def test_seek_moves_the_offset(recording):
+    path, frames = recording
+    sink = Sink()
+    player = WavePlayback(path, sink, buffer=BUFFER)
+    player.seek(0.75)
+    assert player.tell() == 0.75
+    assert player.feed(1000) == 1000
+    assert sink.buffers[0][1] == 6000
+    assert sink.check(frames) == 1000
+    player.seek(10)
+    assert player.at_end()
+    player.seek(-1)
+    assert player.tell() == 0.0
+    player.close()
+
+
+def test_accelerated_playback_keeps_pace_and_finishes(recording, monkeypatch):
+    path, frames = recording
+    sink = Sink()
+    player = WavePlayback(path, sink, speed=4.0, buffer=BUFFER,
+                          finished=sink.done)
+    now = [100.0]
+    monkeypatch.setattr(playback.time, 'monotonic', lambda: now[0])
+    # As start() does, without a main loop to call _tick
+    player._clock = (now[0], player.position)
+
+    now[0] += 0.0625
+    assert player._tick()
+    assert player.position == 0.0625 * RATE * 4
+    assert sink.finished == 0
+
+    now[0] += 0.25
+    while player._tick():
+        now[0] += 0.01
+    assert player.at_end()
+    assert sink.finished == 1
+    assert sink.check(frames) == RATE
+    player.close()
@@ -0,0 +1,92 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from procpool import SharedRing, ChannelProcess
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(8)
+    yield ring
+    ring.close(unlink=True)
+
+
+def test_read_across_the_wrap(ring):
+    ring.append(np.arange(6, dtype=np.int16))
+    ring.append(np.arange(6, 12, dtype=np.int16))
+    assert ring.written == ring.claimed == 12
+    assert list(ring.read(4, 12)) == list(range(4, 12))
+    assert ring.read(3, 12) is None  # overwritten
+    assert ring.read(4, 13) is None  # not written yet
+
+
+def test_reader_sees_the_other_side(ring):
+    other = SharedRing(8, ring.name)
+    try:
+        ring.append(np.arange(5, dtype=np.int16))
+        assert other.written == 5
+        assert list(other.read(0, 5)) == list(range(5))
+    finally:
+        other.close()
+
+
+def test_samples_claimed_by_the_writer_are_not_read(ring):
+    ring.append(np.arange(8, dtype=np.int16))
+
+    # The writer is wrapping over the first samples: it has claimed
+    # them, but not yet written the new ones
+    ring._counts[0] = 11
+    assert ring.read(0, 8) is None
+    assert ring.read(2, 8) is None
+    assert list(ring.read(3, 8)) == list(range(3, 8))
+
+    # and a copy the writer wraps over while it is taken is dropped
+    ring._counts[0] = 8
+    ring._data = WrapsWhileRead(ring, 16)
+    assert ring.read(3, 8) is None
+
+
+class WrapsWhileRead():
+    ''' The samples of a ring, whose writer claims up to claimed as
+    soon as they are read '''
+
+    def __init__(self, ring, claimed):
+        self.ring = ring
+        self.claimed = claimed
+        self.data = ring._data
+
+    def __getitem__(self, key):
+        self.ring._counts[0] = self.claimed
+        return self.data[key]
+
+
+def test_channel_process_tracks_pitch():
+    context = multiprocessing.get_context('forkserver')
+    rate = 48000
+    channel = ChannelProcess(context, rate)
+    try:
+        t = np.arange(rate) / float(rate)
+        tone = (8000 * np.sin(2 * np.pi * 220.0 * t)).astype(np.int16)
+        for start in range(0, rate, 1024):
+            channel.feed(tone[start:start + 1024])
+        while channel.connection.poll(2.0):
+            channel._receive()
+        assert channel.skipped == 0
+        assert abs(channel.frequency - 220.0) < 1.0
+    finally:
+        channel.stop()
+        channel.close()
@@ -0,0 +1,248 @@
+# Copyright (C) 2026, Sugar Labs
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# You should have received a copy of the GNU General Public License
+# along with this library; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Suite 500 Boston, MA 02110-1335 USA
+
+
+from math import floor
+from threading import Lock
+
+import numpy as np
+
+from config import TRIGGER_CHUNK
+
+
+class EdgeTrigger():
+    ''' Find where a channel of a RingBuffer2d crosses a level.
+
+    Only the frames that arrived since the last search are scanned, so
+    the cost of a search follows the data rate, not the time base or
+    the length of the ring buffer.  Positions are write cursors of the
+    ring buffer, at full rate, with the fraction of a frame where the
+    signal meets the level.
+
+    A crossing counts when the signal has gone hysteresis beyond the
+    level, on the other side, since the crossing before it, so that
+    noise around the level does not trigger; and when it comes at
+    least holdoff frames after the last trigger.  Of the crossings in
+    the new frames, the newest one that counts is kept: they are
+    searched from the newest back, and the search stops at the first
+    one that counts. '''
+
+    RISING = 1
+    FALLING = 2
+
+    def __init__(self, edge=RISING, level=0.0, hysteresis=0.0, holdoff=0):
+        self.edge = self.level = self.hysteresis = self.holdoff = None
+        self._frames = np.empty(TRIGGER_CHUNK, dtype=np.float64)
+        self.configure(edge, level, hysteresis, holdoff)
+
+    def configure(self, edge, level, hysteresis=0.0, holdoff=0):
+        ''' Set what to trigger on; a change forgets the last trigger '''
+        settings = (edge, float(level), abs(float(hysteresis)), int(holdoff))
+        if settings == (self.edge, self.level, self.hysteresis,
+                        self.holdoff):
+            return
+        self.edge, self.level, self.hysteresis, self.holdoff = settings
+        self.reset()
+
+    def reset(self):
+        ''' Forget the last trigger and search afresh '''
+        self.position = None  # of the last trigger
+        self.scanned = 0
+        self._armed = False
+        self._ring = None
+        self._last = None  # the newest frame scanned
+
+    def start(self, ringbuffer, channel=0):
+        ''' Forget the last trigger, and only search the frames that
+        arrive from now on '''
+        self.reset()
+        self._ring = ringbuffer
+        self.scanned = ringbuffer.written(channel)
+
+    def update(self, ringbuffer, channel=0, end=None):
+        ''' Search the frames of a channel that arrived since the last
+        call, up to the write cursor end (by default the newest frame);
+        returns the position of the last trigger, or None '''
+        written = ringbuffer.written(channel)
+        if end is None or end > written:
+            end = written
+        oldest = written - ringbuffer.length
+        if ringbuffer is not self._ring or self.scanned > written or \
+                self.scanned < oldest:
+            # A new or resized ring buffer (whose cursors start afresh),
+            # or one that overran us
+            position = self.position
+            if ringbuffer is not self._ring:
+                position = None
+            self.reset()
+            self._ring = ringbuffer
+            self.scanned = max(oldest, 0)
+            if position is not None and position >= oldest:
+                self.position = position
+
+        while self.scanned < end:
+            count = min(end - self.scanned, TRIGGER_CHUNK)
+            frames = self._frames[:count]
+            if ringbuffer.read_into(frames, channel,
+                                    self.scanned + count) is None:
+                # Overwritten while we read: start again from the newest
+                self.scanned = ringbuffer.written(channel)
+                self._armed = False
+                self._last = None
+                break
+            self._search(frames, self.scanned)
+            self.scanned += count
+        if self.position is not None and self.position < oldest:
+            self.position = None
+        return self.position
+
+    def _search(self, frames, first):
+        if self.edge == self.FALLING:
+            frames = np.negative(frames, out=frames)
+            level = -self.level
+        else:
+            level = self.level
+
+        # Crossing i lies between frames i - 1 and i; frame -1 is the
+        # last one of the previous chunk
+        if self._last is None:
+            before = frames[:-1]
+            after = frames[1:]
+            shift = 1
+        else:
+            before = np.empty_like(frames)
+            before[0] = self._last
+            before[1:] = frames[:-1]
+            after = frames
+            shift = 0
+        crossings = np.flatnonzero((before < level) & (after >= level)) + \
+            shift
+        arms = np.flatnonzero(frames <= level - self.hysteresis)
+
+        # Newest first: a crossing counts if the signal was armed since
+        # the one before it
+        for k in range(len(crossings) - 1, -1, -1):
+            crossing = crossings[k]
+            previous = crossings[k - 1] if k > 0 else -1
+            j = np.searchsorted(arms, crossing, 'left')
+            if j > 0 and arms[j - 1] > previous:
+                armed = True
+            else:
+                armed = k == 0 and self._armed
+            if not armed:
+                continue
+            a = before[crossing - shift]
+            b = after[crossing - shift]
+            position = first + crossing - 1 + (level - a) / (b - a)
+            if self.position is None or \
+                    position - self.position >= self.holdoff:
+                self.position = position
+            break
+
+        if len(crossings):
+            self._armed = len(arms) > 0 and arms[-1] >= crossings[-1]
+        elif len(arms):
+            self._armed = True
+        self._last = frames[-1]
+
+
+class Acquisition():
+    ''' Oscilloscope acquisition, done as buffers arrive.
+
+    In NORMAL and SINGLE modes, the trigger of a channel is searched in
+    the capture path, each time the ring buffer has been appended to.
+    Once a trigger has post frames after it, pre frames before it and
+    post frames from it, of every channel, are copied out of the ring
+    buffer into captured, and process() returns True; the display
+    shows that window until there is another.  NORMAL goes on to look
+    for the next trigger, SINGLE stops until arm() is called.  In AUTO
+    mode nothing is done here: the display follows the newest samples,
+    aligned on a trigger where there is one.
+
+    process() runs on the capture thread, the rest on the main thread;
+    they take turns with a lock. '''
+
+    AUTO = 0
+    NORMAL = 1
+    SINGLE = 2
+
+    def __init__(self, channel=0):
+        self.channel = channel
+        self.trigger = EdgeTrigger()
+        self.mode = self.AUTO
+        self.pre = 0
+        self.post = 0
+        self.armed = False
+        self.captured = None  # channels x (pre + post) frames
+        self.fraction = 0.0  # of a frame, from the trigger to the crossing
+        self.captures = 0
+        self._taken = None
+        self._fresh = True
+        self._lock = Lock()
+
+    def configure(self, mode, edge, level, hysteresis, holdoff, pre, post):
+        ''' Set the mode, trigger and window; a change re-arms it and
+        drops the window captured '''
+        settings = (mode, int(pre), int(post))
+        with self._lock:
+            if settings != (self.mode, self.pre, self.post) or \
+                    self.trigger.edge != edge or \
+                    self.trigger.level != float(level):
+                self.mode, self.pre, self.post = settings
+                self.captured = None
+                self._arm()
+            self.trigger.configure(edge, level, hysteresis, holdoff)
+
+    def arm(self):
+        ''' Wait for the next trigger; in SINGLE mode, for one more '''
+        with self._lock:
+            self._arm()
+
+    def _arm(self):
+        self._taken = None
+        self._fresh = True
+        self.armed = self.mode != self.AUTO
+
+    def process(self, ringbuffer):
+        ''' Look for a trigger in the frames that arrived; returns True
+        when a new window was captured '''
+        if not self.armed or self.channel >= ringbuffer.channels:
+            return False
+        with self._lock:
+            return self._process(ringbuffer)
+
+    def _process(self, ringbuffer):
+        if not self.armed:
+            return False
+        if self._fresh:
+            # Triggers from before we were armed do not count
+            self.trigger.start(ringbuffer, self.channel)
+            self._fresh = False
+        written = ringbuffer.written(self.channel)
+        position = self.trigger.update(ringbuffer, self.channel,
+                                       written - self.post)
+        if position is None or position == self._taken:
+            return False
+        first = int(floor(position))
+        window = np.empty((ringbuffer.channels, self.pre + self.post),
+                          dtype=ringbuffer.dtype)
+        for channel in range(ringbuffer.channels):
+            if ringbuffer.read_into(window[channel], channel,
+                                    first + self.post) is None:
+                # Gone already, or not yet there on this channel
+                return False
+        self._taken = position
+        self.fraction = position - first
+        self.captured = window
+        self.captures += 1
+        if self.mode == self.SINGLE:
+            self.armed = False
+        return True
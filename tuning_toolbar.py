@@ -17,6 +17,7 @@ from gi.repository import Gtk
 
 import os
 from gettext import gettext as _
+from math import ceil, log2
 
 from config import XO4, XO175, INSTRUMENT_DICT
 from audiograb import check_output
@@ -42,6 +43,8 @@ COLOR_RED = style.Color('#FF6060')
 COLOR_YELLOW = style.Color('#FFFF00')
 COLOR_GREEN = style.Color('#00FF00')
 SPAN = '<span foreground="%s"><big><b>%s</b></big></span>'
+SILENT = '<span foreground="#808080"><big>%s</big></span>'
+CENTS = '%s <span foreground="#808080">%+.0f¢</span>'
 
 
 class TuningToolbar(Gtk.Toolbar):
@@ -152,6 +155,30 @@ class TuningToolbar(Gtk.Toolbar):
             self.activity.wave.tuning_line = freq
         return
 
+    def show_pitch(self, freq):
+        ''' Show the note nearest to a measured pitch, and how many
+        cents it is off '''
+        if freq > A0 and freq < C8:
+            markup = freq_note(freq, flatsharp=True)
+            if markup is None:
+                return
+            i, cents = freq_cents(freq)
+            self.label.set_markup(CENTS % (markup, cents))
+
+    def show_strings(self, targets, cents):
+        ''' Show the note each string of an instrument plays, flat or
+        sharp, or its name in grey when it is silent '''
+        if cents is None or len(cents) != len(targets):
+            return
+        markup = []
+        for freq, offset in zip(targets, cents):
+            if offset != offset:  # nan: not sounding
+                markup.append(SILENT % freq_note(freq))
+            else:
+                markup.append(freq_note(freq * pow(2.0, offset / 1200.0),
+                                        flatsharp=True) or '?')
+        self.label.set_markup(' '.join(markup))
+
     def _update_freq_entry(self, widget):
         # Calculate a note from a frequency
         if not self._updating_note:  # Only if user types in a freq.
@@ -562,40 +589,77 @@ def note_octave(note, octave):
         return '%s%d' % (note, octave)
 
 
+def _note_markup(i):
+    ''' The tuner markup of a key: very flat, flat, in tune, sharp and
+    very sharp '''
+    label = NOTES[i % 12] + str(int(i / 12))
+    flat = '%s %s %s' % (FLAT, label, FLAT)
+    sharp = '%s %s %s' % (SHARP, label, SHARP)
+    return (SPAN % (COLOR_RED.get_html(), flat),
+            SPAN % (COLOR_YELLOW.get_html(), flat),
+            SPAN % (style.COLOR_WHITE.get_html(), label),
+            SPAN % (COLOR_YELLOW.get_html(), sharp),
+            SPAN % (COLOR_RED.get_html(), sharp))
+
+
+# The frequency, name and tuner markup of each of the 88 keys
+NOTE_FREQS = [A0 * pow(TWELTHROOT2, i) for i in range(88)]
+_NAMES = [note_octave(NOTES[i % 12], int(i / 12)) for i in range(88)]
+_MARKUP = [_note_markup(i) for i in range(88)]
+
+
+def _note_index(freq):
+    ''' The first of the 88 keys within 3% of freq, or None '''
+    if not freq > 0:
+        return None
+    # The lowest key whose upper bound is above freq, give or take
+    # rounding; of it and its neighbours, the first match wins
+    i = int(ceil(log2(freq / (A0 * 1.03)) * 12))
+    for i in range(max(i - 1, 0), min(i + 2, 88)):
+        f = NOTE_FREQS[i]
+        if freq < f * 1.03 and freq > f * 0.97:  # Found a match
+            return i
+    return None
+
+
 def freq_note(freq, flatsharp=False):
+    i = _note_index(freq)
     if flatsharp:  # calculate if we are sharp or flat
-        for i in range(88):
-            f = A0 * pow(TWELTHROOT2, i)
-            if freq < f * 1.03 and freq > f * 0.97:
-                label = NOTES[i % 12] + str(int(i / 12))
-                if freq < f * 0.98:
-                    label = '%s %s %s' % (FLAT, label, FLAT)
-                    return SPAN % (COLOR_RED.get_html(), label)
-                elif freq < f * 0.99:
-                    label = '%s %s %s' % (FLAT, label, FLAT)
-                    return SPAN % (COLOR_YELLOW.get_html(), label)
-                elif freq > f * 1.02:
-                    label = '%s %s %s' % (SHARP, label, SHARP)
-                    return SPAN % (COLOR_RED.get_html(), label)
-                elif freq > f * 1.01:
-                    label = '%s %s %s' % (SHARP, label, SHARP)
-                    return SPAN % (COLOR_YELLOW.get_html(), label)
-                else:
-                    return SPAN % (style.COLOR_WHITE.get_html(), label)
-    else:
-        for i in range(88):
-            f = A0 * pow(TWELTHROOT2, i)
-            if freq < f * 1.03 and freq > f * 0.97:  # Found a match
-                return note_octave(NOTES[i % 12], int(i / 12))
+        if i is None:
+            return None
+        f = NOTE_FREQS[i]
+        if freq < f * 0.98:
+            return _MARKUP[i][0]
+        elif freq < f * 0.99:
+            return _MARKUP[i][1]
+        elif freq > f * 1.02:
+            return _MARKUP[i][4]
+        elif freq > f * 1.01:
+            return _MARKUP[i][3]
+        else:
+            return _MARKUP[i][2]
+    if i is None:
         return '?'
+    return _NAMES[i]
 
 
 def freq_index(freq):
-    for i in range(88):
-        f = A0 * pow(TWELTHROOT2, i)
-        if freq < f * 1.03 and freq > f * 0.97:  # Found a match
-            return i
-    return 0
+    i = _note_index(freq)
+    if i is None:
+        return 0
+    return i
+
+
+def freq_cents(freq):
+    ''' The key freq_note() names for freq, else the nearest of the 88,
+    and how many cents freq is above (or below) it; None if freq is not
+    a pitch '''
+    if not freq > 0:
+        return None
+    i = _note_index(freq)
+    if i is None:
+        i = min(max(int(round(log2(freq / A0) * 12)), 0), 87)
+    return i, 1200 * log2(freq / NOTE_FREQS[i])
 
 
 def index_to_octave(i):